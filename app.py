@@ -1,28 +1,17 @@
 import streamlit as st
+import copy
 import json
 import pandas as pd
-from modelo import run_simulation, process_parameters, include_stacked_chart_diagram_for_good_quality_components, plot_results, plot_stacked_chart, plot_discarded_components_stacked_chart
+from background import BackgroundSimulation
+from modelo import process_parameters, include_stacked_chart_diagram_for_good_quality_components
+from plots import plot_results, plot_stacked_chart, plot_discarded_components_stacked_chart
 
 import logging
-import time
-import threading
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logging.debug("Debugging started in app.py")
 
-def keep_alive():
-    """Evita que la app se desconecte enviando señales de actividad cada 30 segundos."""
-    placeholder = st.empty()  # Crea un espacio invisible en la interfaz
-    count = 0
-    while True:
-        count += 1
-        placeholder.text(f"Keep-alive ping {count}")  # Actualiza la UI silenciosamente
-        time.sleep(30)  # Espera 30 segundos antes de la siguiente actualización
-
-keep_alive_thread = threading.Thread(target=keep_alive, daemon=True)
-keep_alive_thread.start()
-
 # Título
 st.title("Remanufacturing Process Simulation")
 st.markdown(
@@ -59,7 +48,14 @@ warmup_period_hours = st.sidebar.number_input(
 )
 warmup_period = warmup_period_hours * 60  # Convertir horas a minutos
 
-monitoring_interval = st.sidebar.number_input("Monitoring Interval (min)", value=1, step=1)
+detect_warmup = st.sidebar.radio(
+    "Detect end of warm-up automatically (MSER-5)",
+    options=['no', 'yes'],
+    index=0,
+    help="Statistics then start at the detected end of the warm-up (shown as 'Warmup End', in minutes)"
+)
+
+monitoring_interval = st.sidebar.number_input("Monitoring Interval (min)", value=1, step=1, min_value=1)
 
 include_stacked_chart_diagram_for_good_quality_components = st.sidebar.radio(
     "Show Buffer Graphs by Component",
@@ -604,9 +600,12 @@ if st.button("Run Simulation"):
     #st.write("Contenido de process_times_repair antes de la actualización:")
     #st.write(process_times_repair)
 
-    process_parameters.update({
+    # Copia de los parámetros por defecto: cada ejecución recibe su propio escenario
+    scenario_parameters = copy.deepcopy(process_parameters)
+    scenario_parameters.update({
         "monitoring_interval": monitoring_interval,
         "warmup_period": warmup_period,
+        "detect_warmup": detect_warmup,
         "include_stacked_chart_diagram_for_good_quality_components": include_stacked_chart_diagram_for_good_quality_components,
         "replenish_buffers": replenish_buffers,
         "include_arrival_variability": include_arrival_variability,
@@ -647,14 +646,20 @@ if st.button("Run Simulation"):
     #st.write(json.dumps(process_parameters, indent=4))
 
 
-    # Ejecutar la simulación
-    simulation_output = run_simulation(simulation_time, process_parameters, generate_plots=False)
+    # Lanzar la simulación en segundo plano (una anterior en curso se cancela)
+    previous = st.session_state.get("simulation")
+    if previous is not None:
+        previous.cancel()
+    try:
+        st.session_state["simulation"] = BackgroundSimulation(simulation_time, scenario_parameters)
+    except (KeyError, ValueError) as error:
+        # Parámetros inválidos (p. ej. porcentajes que no suman 100%): avisar sin ejecutar
+        st.session_state.pop("simulation", None)
+        st.error(f"Invalid parameters: {error}")
+        st.stop()
 
-    # Extraer resultados
-    results = simulation_output["results"]
-    monitoring_data = simulation_output["monitoring_data"]
-    include_stacked_chart = simulation_output["include_stacked_chart"]
 
+def show_results(results, monitoring_data, include_stacked_chart):
     # Mostrar resultados principales
     st.write("### Simulation Results")
     results_df = pd.DataFrame([results]).round(2)
@@ -663,9 +668,40 @@ if st.button("Run Simulation"):
     # Mostrar gráficos
     st.write("### Result Charts")
     plot_results(monitoring_data)
-    if include_stacked_chart_diagram_for_good_quality_components  == 'yes':
+    # Según la ejecución mostrada, no el valor actual del sidebar
+    if include_stacked_chart == 'yes':
         plot_stacked_chart(monitoring_data)
         plot_discarded_components_stacked_chart(monitoring_data)
 
 
-
+@st.fragment(run_every=2)
+def simulation_progress(simulation):
+    # Se vuelve a ejecutar cada 2 s mientras la simulación avanza
+    if not simulation.running:
+        st.rerun()
+    now, events_per_second, remaining = simulation.progress()
+    eta = f"{remaining:.0f} s" if remaining == remaining else "..."
+    st.progress(now / simulation.simulation_time,
+                text=f"Simulated {now / 1440:.1f} of {simulation.simulation_time / 1440:.1f} days · "
+                     f"{events_per_second:,.0f} events/s · ETA {eta}")
+    if st.button("Cancel Simulation"):
+        simulation.cancel()
+    snapshot = simulation.snapshot()
+    if snapshot is not None:
+        st.caption(f"Partial results at day {snapshot['time'] / 1440:.1f}")
+        show_results(snapshot["results"], snapshot["monitoring_data"], snapshot["include_stacked_chart"])
+
+
+simulation = st.session_state.get("simulation")
+if simulation is not None:
+    if simulation.running:
+        simulation_progress(simulation)
+    elif simulation.error is not None:
+        st.error(f"Simulation failed: {simulation.error}")
+    elif simulation.cancelled:
+        snapshot = simulation.snapshot()
+        st.warning(f"Simulation cancelled at day {snapshot['time'] / 1440:.1f}; results below are partial.")
+        show_results(snapshot["results"], snapshot["monitoring_data"], snapshot["include_stacked_chart"])
+    else:
+        show_results(simulation.output["results"], simulation.output["monitoring_data"],
+                     simulation.output["include_stacked_chart"])
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import numpy as np
+
+from cache import ResultCache, cache_key
+from modelo import SEED, SimulationRun, effective_parameters, simulation_output
+
+
+# One simulation run in a background thread, for the Streamlit app.
+#
+# The worker advances the model clock in chunks of simulated time. After
+# each chunk it publishes its progress, checks whether the run was
+# cancelled and, when the app asked for one, a copy of the partial KPIs and
+# monitoring series. The app polls these from its own script thread;
+# nothing here touches Streamlit. Finished runs go to the result cache like
+# run_simulation() outputs, and a cached scenario finishes immediately.
+
+
+def copy_series(monitoring_data):
+    # The worker keeps appending to the recorder and the level traces
+    return {name: tuple(np.array(part) for part in series) if isinstance(series, tuple) else np.array(series)
+            for name, series in monitoring_data.items()}
+
+
+class BackgroundSimulation:
+
+    def __init__(self, simulation_time, process_parameters, seed=SEED, use_cache=True, chunks=200):
+        self.simulation_time = simulation_time
+        self.run = SimulationRun(simulation_time, process_parameters, seed)  # Invalid parameters raise here
+        self.cache = ResultCache() if use_cache else None
+        self.key = cache_key(simulation_time, effective_parameters(process_parameters), seed)
+        self.chunk = max(1, simulation_time / chunks)  # Simulated minutes per step of the worker
+        self.output = None  # run_simulation() output once finished
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._snapshot_wanted = threading.Event()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._progress = (0, 0, 0.0)  # (simulated time, events, wall seconds)
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self):
+        """(simulated time, events per second, estimated seconds left)"""
+        with self._lock:
+            now, events, elapsed = self._progress
+        events_per_second = events / elapsed if elapsed > 0 else 0.0
+        remaining = elapsed * (self.simulation_time - now) / now if now > 0 else float('nan')
+        return now, events_per_second, remaining
+
+    def snapshot(self):
+        """Latest partial {'time', 'results', 'monitoring_data',
+        'include_stacked_chart'} (or None) and
+        ask the worker for a fresh one after its current chunk."""
+        self._snapshot_wanted.set()
+        with self._lock:
+            return self._snapshot
+
+    def _publish_snapshot(self):
+        self._snapshot_wanted.clear()
+        run = self.run
+        snapshot = {'time': run.env.now, 'results': run.results(), 'monitoring_data': copy_series(run.monitoring_data()),
+                    'include_stacked_chart': run.include_stacked_chart_diagram_for_good_quality_components}
+        with self._lock:
+            self._snapshot = snapshot
+
+    def _work(self):
+        try:
+            output = self.cache.load(self.key) if self.cache is not None else None
+            if output is None:
+                run = self.run
+                run.start()
+                started = time.perf_counter()
+                while run.env.now < self.simulation_time:
+                    if self._cancel.is_set():
+                        self.cancelled = True
+                        self._publish_snapshot()
+                        return
+                    run.advance(run.env.now + self.chunk)
+                    with self._lock:
+                        self._progress = (run.env.now, run.events_processed, time.perf_counter() - started)
+                    if self._snapshot_wanted.is_set():
+                        self._publish_snapshot()
+                output = simulation_output(run)
+                if self.cache is not None:
+                    self.cache.store(self.key, output)
+            self.output = output
+        except Exception as error:  # Reported by the app instead of dying silently with the thread
+            self.error = error
@@ -0,0 +1,179 @@
+import argparse
+import copy
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11: only JSON scenario files
+    tomllib = None
+
+from cli import print_table, weeks_to_minutes, worker_count
+from modelo import SEED, effective_parameters, get_path, process_parameters, run_simulation, set_path, simulation_time
+from parameters import compile_parameters
+
+
+# Headless batch runs of scenario files, without a Streamlit runtime.
+#
+# A scenario file (JSON or TOML) mirrors process_parameters and the run
+# flags, and only needs the values that differ from the defaults in
+# modelo.py, e.g.
+#
+#     name = "two_repairers"
+#     weeks = 8
+#     event_driven_stations = "yes"
+#     [component_repair]
+#     capacity = 2
+#
+# simulation_time (minutes) or weeks (not both), seed and name are read
+# too; the name becomes a directory, so it may only hold letters, digits,
+# '.', '_' and '-'. A file can also hold several scenarios in a
+# `scenarios` list; the other keys of the file then apply to all of them,
+# except that a scenario's own duration replaces the common one. Every
+# scenario writes its KPIs, buffer summaries and monitoring series to
+# <output>/<name>/, and the KPIs of all scenarios are collected in
+# <output>/kpis.csv.
+
+def read_scenario_file(path):
+    with open(path, 'rb') as f:
+        if path.endswith('.toml'):
+            if tomllib is None:
+                raise ValueError(f"{path}: TOML scenario files need Python 3.11 or later")
+            return tomllib.load(f)
+        return json.load(f)
+
+
+def apply_overrides(params, overrides, prefix=''):
+    """Set every leaf of `overrides` in params; unknown paths raise KeyError."""
+    for key, value in overrides.items():
+        path = prefix + key
+        if isinstance(value, dict) and isinstance(get_path(params, path), dict):
+            apply_overrides(params, value, path + '.')
+        else:
+            set_path(params, path, value)
+
+
+def merge(base, overrides):
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+# A scenario name is the name of its output directory
+SCENARIO_NAME = re.compile(r'[A-Za-z0-9_-][A-Za-z0-9._-]*')
+
+
+def make_scenario(name, spec, base_parameters=process_parameters):
+    """Scenario dict (name, simulation_time, seed, params) from one file entry."""
+    if not isinstance(name, str) or not SCENARIO_NAME.fullmatch(name):
+        raise ValueError(f"Scenario name {name!r}: use letters, digits, '.', '_' and '-', not starting with '.'")
+    spec = dict(spec)
+    spec.pop('name', None)
+    if 'weeks' in spec and 'simulation_time' in spec:
+        raise ValueError(f"Scenario {name}: give weeks or simulation_time, not both")
+    minutes = spec.pop('simulation_time', simulation_time)
+    if 'weeks' in spec:
+        minutes = weeks_to_minutes(spec.pop('weeks'))
+    seed = spec.pop('seed', SEED)
+    params = effective_parameters(base_parameters)
+    apply_overrides(params, spec)
+    compile_parameters(params)  # Bad values are reported before any run starts
+    return {'name': name, 'simulation_time': minutes, 'seed': seed, 'params': params}
+
+
+def load_scenarios(paths):
+    scenarios = []
+    for path in paths:
+        data = read_scenario_file(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        entries = data.pop('scenarios', None)
+        if entries is None:
+            scenarios.append(make_scenario(data.get('name', stem), data))
+            continue
+        for i, entry in enumerate(entries):
+            # Los valores comunes del fichero se combinan con los del escenario;
+            # la duración del escenario sustituye a la común, en minutos o semanas
+            common = data
+            if 'weeks' in entry or 'simulation_time' in entry:
+                common = {key: value for key, value in data.items() if key not in ('weeks', 'simulation_time')}
+            spec = merge(common, entry)
+            scenarios.append(make_scenario(entry.get('name', f'{stem}_{i}'), spec))
+    names = [scenario['name'] for scenario in scenarios]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate scenario names: {', '.join(duplicates)}")
+    return scenarios
+
+
+def monitoring_frame(monitoring_data):
+    # Sampled series share the 'time' column; step series (track_buffer_changes)
+    # have their own change times and are written in long format
+    import pandas as pd
+
+    if all(not isinstance(series, tuple) for series in monitoring_data.values()):
+        return pd.DataFrame(monitoring_data)
+    frames = [pd.DataFrame({'series': name, 'time': times, 'level': levels})
+              for name, (times, levels) in monitoring_data.items()]
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_scenario(scenario, output_dir, write_series=True, use_cache=True):
+    # Worker: writes the files of one scenario and returns its KPIs
+    output = run_simulation(scenario['simulation_time'], scenario['params'], seed=scenario['seed'], use_cache=use_cache)
+    directory = os.path.join(output_dir, scenario['name'])
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'kpis.json'), 'w') as f:
+        json.dump({'simulation_time': scenario['simulation_time'], 'seed': scenario['seed'],
+                   'results': output["results"], 'process_parameters': scenario['params']}, f, indent=2)
+    output["Buffer Summary By Type"].to_csv(os.path.join(directory, 'buffer_summary_by_type.csv'), index=False)
+    output["Buffer Summary Total"].to_csv(os.path.join(directory, 'buffer_summary_total.csv'), index=False)
+    if write_series:
+        monitoring_frame(output["monitoring_data"]).to_csv(os.path.join(directory, 'monitoring.csv'), index=False)
+    return output["results"]
+
+
+def run_batch(scenarios, output_dir, workers=None, write_series=True, use_cache=True):
+    """Run every scenario, write its files and return the KPI table (one row per scenario)."""
+    import pandas as pd
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = worker_count(workers, len(scenarios))
+    n = len(scenarios)
+    if workers == 1:
+        results = [run_scenario(scenario, output_dir, write_series, use_cache) for scenario in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_scenario, scenarios, [output_dir] * n, [write_series] * n,
+                                        [use_cache] * n))
+    table = pd.DataFrame(results, index=pd.Index([scenario['name'] for scenario in scenarios], name='scenario'))
+    table.insert(0, 'simulation_time', [scenario['simulation_time'] for scenario in scenarios])
+    table.insert(1, 'seed', [scenario['seed'] for scenario in scenarios])
+    table.to_csv(os.path.join(output_dir, 'kpis.csv'))
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run scenario files of the remanufacturing model without Streamlit.")
+    parser.add_argument('scenarios', nargs='+', metavar='SCENARIO', help="JSON or TOML scenario file")
+    parser.add_argument('--output', required=True, help="directory for kpis.csv and one folder per scenario")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--no-series', action='store_true', help="do not write the monitoring time series")
+    parser.add_argument('--no-cache', action='store_true', help="always simulate, ignoring the result cache")
+    args = parser.parse_args(argv)
+
+    try:
+        scenarios = load_scenarios(args.scenarios)
+    except (OSError, KeyError, ValueError) as error:
+        parser.error(error.args[0] if isinstance(error, KeyError) else str(error))
+    table = run_batch(scenarios, args.output, args.workers, not args.no_series, not args.no_cache)
+    print_table(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Import cost of the simulation engine, measured in fresh interpreters.
+#
+# 'engine' is what a worker process pays now (import modelo). 'engine +
+# plotting' adds the modules modelo.py used to import at load time
+# (matplotlib.pyplot, Streamlit and pandas, through plots.py), which is
+# what every worker paid before the plotting was split out.
+
+CASES = [
+    ('interpreter', 'pass'),
+    ('engine', 'import modelo'),
+    ('engine + plotting', 'import modelo, plots, pandas'),
+]
+
+PROBE = '''
+import resource, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('streamlit', 'matplotlib', 'pandas') if name in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ','.join(heavy) or '-')
+'''
+
+
+def measure(statement, repeat):
+    here = os.path.dirname(os.path.abspath(__file__))
+    times, memory = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(statement=statement)], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        memory.append(int(output[1]) / 1024)  # ru_maxrss is in KB on Linux
+        heavy = output[2]
+    return statistics.median(times), statistics.median(memory), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time and memory of the simulation engine.")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per case (median is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<20} {'import (ms)':>12} {'peak RSS (MB)':>14}  heavy modules loaded")
+    for name, statement in CASES:
+        elapsed, memory, heavy = measure(statement, args.repeat)
+        print(f"{name:<20} {elapsed * 1000:>12.0f} {memory:>14.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
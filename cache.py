@@ -0,0 +1,179 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+# Persistent result cache shared by the app, the command line tools and the
+# sweep workers.
+#
+# An entry is keyed by a hash of the canonical JSON of the full effective
+# configuration (process_parameters with every flag filled in), the
+# simulation time, the seed and a hash of the engine sources, so editing the
+# model invalidates old results automatically. Each entry is one .npz file:
+# the monitoring series and buffer summaries as columns plus a small JSON
+# header with the KPIs. Files are written atomically, so several processes
+# can share a directory. When the directory grows past its size limit the
+# least recently used entries are removed.
+
+# Sources whose content defines the simulation results
+ENGINE_FILES = ['modelo.py', 'stores.py', 'monitoring.py', 'random_numbers.py', 'parameters.py', 'entities.py']
+
+CACHE_DIR = os.environ.get('REMANUFACTURING_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'remanufacturing_process'))
+CACHE_SIZE_MB = float(os.environ.get('REMANUFACTURING_CACHE_SIZE_MB', 1024))  # 0 disables the cache
+
+_code_version = None
+
+
+def canonical_json(value):
+    def convert(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return str(obj)
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=convert)
+
+
+def code_version():
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in ENGINE_FILES:
+            with open(os.path.join(here, name), 'rb') as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def cache_key(simulation_time, effective_parameters, seed):
+    config = {
+        'simulation_time': simulation_time,
+        'process_parameters': effective_parameters,
+        'seed': seed,
+        'code_version': code_version()
+    }
+    return hashlib.sha256(canonical_json(config).encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory=CACHE_DIR, max_size_mb=CACHE_SIZE_MB):
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = self.max_bytes > 0
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def load(self, key):
+        """Cached run_simulation output, or None."""
+        entry = self._open(key)
+        if entry is None:
+            return None
+        import pandas as pd  # Not loaded by the engine unless a full output is read
+        with entry:
+            header = json.loads(entry['header'].item())
+            monitoring_data = {}
+            for name, layout in header['monitoring']:
+                if layout == 'steps':
+                    monitoring_data[name] = (entry[f'monitoring/{name}/times'], entry[f'monitoring/{name}/levels'])
+                else:
+                    monitoring_data[name] = entry[f'monitoring/{name}']
+            output = {
+                "results": header['results'],
+                "include_stacked_chart": header['include_stacked_chart'],
+                "monitoring_data": monitoring_data
+            }
+            for table, columns in header['tables'].items():
+                output[table] = pd.DataFrame({column: entry[f'{table}/{column}'] for column in columns})
+        return output
+
+    def load_results(self, key):
+        """Only the KPI dict of a cached run, or None."""
+        entry = self._open(key)
+        if entry is None:
+            return None
+        with entry:
+            return json.loads(entry['header'].item())['results']
+
+    def store(self, key, output):
+        if not self.enabled:
+            return
+        arrays = {}
+        monitoring = []
+        for name, series in output["monitoring_data"].items():
+            if isinstance(series, tuple):
+                arrays[f'monitoring/{name}/times'], arrays[f'monitoring/{name}/levels'] = series
+                monitoring.append((name, 'steps'))
+            else:
+                arrays[f'monitoring/{name}'] = series
+                monitoring.append((name, 'samples'))
+        tables = {}
+        for table in ["Buffer Summary By Type", "Buffer Summary Total"]:
+            frame = output[table]
+            tables[table] = list(frame.columns)
+            for column in frame.columns:
+                values = frame[column].to_numpy()
+                arrays[f'{table}/{column}'] = values.astype(str) if values.dtype == object else values
+        header = {
+            'results': output["results"],
+            'include_stacked_chart': output["include_stacked_chart"],
+            'monitoring': monitoring,
+            'tables': tables
+        }
+        arrays['header'] = np.array(json.dumps(header))  # Keeps the order of results
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        # Escritura atómica: otro proceso nunca ve un fichero a medias
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                os.remove(entry.path)
+
+    def _open(self, key):
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            entry = np.load(path, allow_pickle=False)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # Marks the entry as recently used
+        except FileNotFoundError:
+            pass
+        return entry
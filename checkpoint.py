@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import pickle
+import tempfile
+
+from cache import code_version
+from cli import WEEK, weeks_to_minutes
+from modelo import (SEED, STATISTICS_COUNTERS, SimulationRun, effective_parameters, process_parameters,
+                    simulation_output, simulation_time)
+
+
+# Resumable long runs, by deterministic replay.
+#
+# This does not save the simulation state. A running model cannot be
+# pickled (see modelo.SimulationRun), so instead of restoring its state the
+# file written every few simulated weeks stores what is needed to rebuild
+# it: the run configuration and seed, the simulated time, everything
+# recorded so far (monitoring samples, buffer statistics, level traces) and
+# a fingerprint of the state. resume_run() builds a new run and simulates
+# the whole prefix again with recording switched off; the model is
+# deterministic, so it reaches the same state, which the fingerprint
+# confirms. Then the recorded data is put back and the run continues, with
+# results bit-identical to an uninterrupted run. Resuming or extending a
+# run from disk therefore costs the simulation of the prefix (not its
+# recording); only SimulationRun.extend() on a run still in memory skips
+# it. This is a deliberate deviation from saving the complete state, which
+# would mean rewriting every station process as a picklable state machine.
+# A file is only valid for the engine sources that wrote it, and it is a
+# pickle: only load files you wrote.
+
+CHECKPOINT_VERSION = 1
+
+
+def fingerprint(run):
+    return {
+        'time': run.env.now,
+        'counters': {name: getattr(run, name) for name in STATISTICS_COUNTERS},
+        'levels': {name: buffer.level for name, buffer in run.buffers.items()},
+        'backorders': list(run.backorders)
+    }
+
+
+def save_checkpoint(run, path):
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'code_version': code_version(),
+        'simulation_time': run.simulation_time,
+        'params': run.params,
+        'seed': run.seed,
+        'fingerprint': fingerprint(run),
+        'events_processed': run.events_processed,
+        'recorder': run.recorder,
+        'buffer_statistics': run.buffer_statistics,
+        'buffer_log': run.buffer_log,
+        'request_traces': run.request_traces,
+        'statistics': (run.statistics_start, run.statistics_baseline, run.statistics_marks, run.warmup_end,
+                       run.warmup_detector, run.carried_delays, run.carried_delay_time, run.shipment_log),
+        'traces': {name: (buffer.trace, getattr(buffer, 'type_traces', None)) for name, buffer in run.buffers.items()}
+    }
+    # Escritura atómica: un fallo durante la escritura deja el fichero anterior intacto
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    with open(path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: unsupported replay file version {checkpoint.get('version')!r}")
+    if checkpoint['code_version'] != code_version():
+        raise ValueError(f"{path} was written by other engine sources and cannot be replayed")
+    return checkpoint
+
+
+def resume_run(path):
+    """SimulationRun rebuilt from the file at `path` by replaying the saved
+    prefix (without recording it) and putting back the recorded data. The
+    replay takes a good part of the time the prefix took."""
+    checkpoint = load_checkpoint(path)
+    run = SimulationRun(checkpoint['simulation_time'], checkpoint['params'], checkpoint['seed'])
+    # Replay without recording anything
+    run.replaying = True
+    for buffer in run.buffers.values():
+        buffer.trace = None
+        if hasattr(buffer, 'type_traces'):
+            buffer.type_traces = None
+    run.request_traces = None
+    run.start()
+    run.advance(checkpoint['fingerprint']['time'])
+    if fingerprint(run) != checkpoint['fingerprint']:
+        raise RuntimeError(f"Replaying {path} did not reach the saved state")
+
+    run.replaying = False
+    # The count depends on how the original run was split into advance() calls
+    run.events_processed = checkpoint['events_processed']
+    run.recorder = checkpoint['recorder']
+    run.buffer_statistics = checkpoint['buffer_statistics']
+    run.buffer_log = checkpoint['buffer_log']
+    run.request_traces = checkpoint['request_traces']
+    (run.statistics_start, run.statistics_baseline, run.statistics_marks, run.warmup_end,
+     run.warmup_detector, run.carried_delays, run.carried_delay_time, run.shipment_log) = checkpoint['statistics']
+    for name, (trace, type_traces) in checkpoint['traces'].items():
+        buffer = run.buffers[name]
+        buffer.trace = trace
+        if hasattr(buffer, 'type_traces'):
+            buffer.type_traces = type_traces
+    return run
+
+
+def run_with_checkpoints(simulation_time, process_parameters, path, every, seed=SEED, resume=True):
+    """run_simulation() output of a run that writes its replay file to `path`
+    every `every` simulated minutes. With resume, an existing file of the
+    same configuration is continued, and a finished run is extended if
+    simulation_time is longer than its horizon. Both replay the saved
+    prefix first (see resume_run)."""
+    if every <= 0:
+        raise ValueError(f"every must be > 0, got {every}")
+    if resume and os.path.exists(path):
+        checkpoint = load_checkpoint(path)
+        if checkpoint['params'] != effective_parameters(process_parameters) or checkpoint['seed'] != seed:
+            raise ValueError(f"{path} belongs to a run with other parameters or seed")
+        run = resume_run(path)
+        if simulation_time != run.simulation_time:
+            run.extend(simulation_time)
+    else:
+        run = SimulationRun(simulation_time, process_parameters, seed)
+        run.start()
+    while run.env.now < run.simulation_time:
+        run.advance(run.env.now + every)
+        save_checkpoint(run, path)
+    return simulation_output(run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the model saving a replay file periodically; running again "
+                                                 "resumes it by replaying the saved prefix.")
+    parser.add_argument('--checkpoint', required=True, help="replay file (continued or extended if it exists)")
+    parser.add_argument('--weeks', type=float, default=simulation_time / WEEK,
+                        help="horizon; longer than a finished run extends it (the saved prefix is replayed first)")
+    parser.add_argument('--every-weeks', type=float, default=1, help="simulated weeks between writes of the replay file")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--fresh', action='store_true', help="start over, ignoring an existing replay file")
+    parser.add_argument('--output', help="write the KPIs to this JSON file")
+    args = parser.parse_args(argv)
+
+    output = run_with_checkpoints(weeks_to_minutes(args.weeks), process_parameters, args.checkpoint,
+                                  args.every_weeks * WEEK, args.seed, not args.fresh)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output["results"], f, indent=2)
+    print(json.dumps(output["results"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
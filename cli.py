@@ -0,0 +1,26 @@
+import os
+
+
+# Small helpers shared by the command line tools (batch, replications, sweep,
+# sequential, warm_start, checkpoint). pandas is only imported to print a
+# table, so importing a tool (e.g. in a worker process) does not load it.
+
+WEEK = 7 * 24 * 60  # Minutes
+
+
+def weeks_to_minutes(weeks):
+    return round(weeks * WEEK)
+
+
+def worker_count(workers, tasks):
+    """Worker processes for `tasks` tasks: `workers` (all cores by default),
+    but never more than the tasks and at least one."""
+    return min(workers or os.cpu_count() or 1, tasks) or 1
+
+
+def print_table(table, float_format='{:.3f}'):
+    import pandas as pd  # Only for the display options
+
+    with pd.option_context('display.width', 120, 'display.max_columns', None,
+                           'display.float_format', float_format.format):
+        print(table)
@@ -0,0 +1,45 @@
+# Entities that flow through the remanufacturing line.
+#
+# Plain classes with __slots__: no per-instance __dict__, so a record costs
+# a few pointers instead of a hash table, and stations update a component in
+# place instead of re-creating it at every routing step. Conditions and
+# qualities are the integer codes from parameters.py, `created` is the
+# simulation time at which the entity entered the system.
+
+
+class Core:
+    __slots__ = ('core_id', 'condition', 'created')
+
+    def __init__(self, core_id, created):
+        self.core_id = core_id
+        self.condition = None  # Assigned at cleaning and inspection
+        self.created = created
+
+    def __repr__(self):
+        return f"Core({self.core_id}, condition={self.condition})"
+
+
+class Component:
+    __slots__ = ('type', 'code', 'entity', 'condition', 'repair_attempts', 'created')
+
+    def __init__(self, component_type, code, entity, created, condition=None):
+        self.type = component_type
+        self.code = code
+        self.entity = entity  # (core_id, position in the core): key of its random draws
+        self.condition = condition  # Assigned at component cleaning
+        self.repair_attempts = 0
+        self.created = created
+
+    def __repr__(self):
+        return f"Component({self.type}, entity={self.entity}, condition={self.condition})"
+
+
+class Product:
+    __slots__ = ('product_id', 'created')
+
+    def __init__(self, product_id, created):
+        self.product_id = product_id
+        self.created = created
+
+    def __repr__(self):
+        return f"Product({self.product_id})"
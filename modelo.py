@@ -1,33 +1,36 @@
 import simpy
+import copy
+import json
 import math
-import random
-import matplotlib.pyplot as plt
+import operator
+from collections import deque
 import numpy as np
-import pandas as pd
-import streamlit as st
-
-
-# Configurar la semilla para reproducibilidad
-SEED = 3
-random_generators = {
-    'cleaning_and_inspection': random.Random(SEED),
-    'component_cleaning': random.Random(SEED + 1),
-    'component_inspection': random.Random(SEED + 2),
-    'component_repair': random.Random(SEED + 3),
-    'finished_product_inspection': random.Random(SEED + 4),
-    'demand_arrival': random.Random(SEED + 5),
-    'cores_arrival': random.Random(SEED + 6),
-}
+
+from cache import ResultCache, cache_key
+from monitoring import BufferStatistics, LevelTrace, MonitoringRecorder, WarmupDetector
+from entities import Component, Core, Product
+from parameters import HIGH, LOW, MEDIUM, compile_parameters
+from random_numbers import SEED, make_random_numbers
+from stores import CountingSink, TypedStore, WaitableStore
+
 
 # Simulation parameters
 simulation_time = 80640  # Total simulation time: 8 weeks in minutes
 warmup_period = 2520   # Warmup period
 monitoring_interval = 1
+track_buffer_changes = 'no'  # 'yes': record each buffer level only when it changes instead of sampling it every monitoring_interval
+keep_buffer_log = 'no'  # 'yes': also keep every buffer sample in buffer_log (memory grows with the run length); needs track_buffer_changes = 'no'
 include_stacked_chart_diagram_for_good_quality_components = 'yes'
 replenish_buffers = 'yes'
 include_arrival_variability = 'no'
 include_demand_variability  = 'no'
 discard_at_cleaning_and_inspection = 'yes'
+stacked_chart_component_types = ["Component_A", "Component_B", "Component_C"]
+event_driven_stations = 'no'  # 'yes': stations sleep until their upstream buffer has work instead of polling every minute
+random_numbers = 'per_process'  # 'block': NumPy block streams (faster, other draws); 'common': draws keyed by entity and decision (common random numbers across scenarios)
+antithetic = 'no'  # 'yes': mirror every uniform draw (u -> 1 - u), for antithetic pairs of runs
+keep_discard_times = 'no'  # 'yes': the discard sinks also keep the arrival time of every discarded item
+detect_warmup = 'no'  # 'yes': find the end of the warmup while running (MSER-5) and report statistics only after it; series start once it is found
 
 
 # Parameters to be modified by students
@@ -190,38 +193,94 @@ cost_per_delay = 100
 operational_cost_per_hour = 50
 prize = 6000
 
-# KPIs
-total_requests = 0
-fulfilled_requests = 0
-delayed_requests = 0
-cumulative_delay_time = 0
-cumulative_work_hours = 0
-core_adquisition_cost = 0
-income = 0
-last_request_time=0
-buyed_components_cost = 0
-cont=0
+# Buffers and queues (default capacities; '<buffer>_capacity' in process_parameters overrides them)
+buffer_capacities = {
+    'arrival_buffer': 500,
+    'cleaned_buffer': 500,
+    'discarded_cores_buffer': None,  # Sink: no capacity
+    'components_buffer': 500,
+    'cleaned_components_buffer': 500,
+    'good_quality_components_buffer': 500,
+    'to_be_repaired_components_buffer': 500,
+    'discarded_components_buffer': None,  # Sink: no capacity
+    'finished_products_buffer': 500,
+    'inspected_finished_products_buffer': 500,
+    'discarded_products_buffer': None  # Sink: no capacity
+}
 
-# Buffers and queues
-arrival_buffer_capacity = 500
-cleaned_buffer_capacity = 500
-discarded_cores_buffer_capacity = 500
-components_buffer_capacity = 500
-cleaned_components_buffer_capacity = 500
-good_quality_components_buffer_capacity = 500
-to_be_repaired_components_buffer_capacity = 500
-discarded_components_buffer_capacity = 500
-finished_products_buffer_capacity = 500
-inspected_finished_products_buffer_capacity = 500
-discarded_products_buffer_capacity = 500
+# Buffers holding components, indexed by component type
+component_buffers = ['components_buffer', 'cleaned_components_buffer', 'good_quality_components_buffer',
+                     'to_be_repaired_components_buffer', 'discarded_components_buffer']
+
+# Terminal buffers: nothing is taken out of them, they only count what arrives
+sink_buffers = ['discarded_cores_buffer', 'discarded_components_buffer', 'discarded_products_buffer']
+
+# Levels MSER-5 looks at with detect_warmup (the sinks only ever grow)
+warmup_detection_buffers = [buffer_name for buffer_name in buffer_capacities if buffer_name not in sink_buffers]
+# Cycles of the slowest input (demand or core arrivals) the samples must span
+# before MSER is trusted: over a shorter stretch a quiet plant looks steady
+warmup_detection_cycles = 5
+
+# Run counters behind the KPIs; with detect_warmup their values at the end
+# of the warmup are subtracted
+STATISTICS_COUNTERS = ['total_requests', 'fulfilled_requests', 'delayed_requests', 'cumulative_delay_time',
+                       'cumulative_work_hours', 'core_adquisition_cost', 'income']
+
+
+def default_flags():
+    """Run flags and buffer capacities that process_parameters may override."""
+    flags = {
+        'warmup_period': warmup_period,
+        'monitoring_interval': monitoring_interval,
+        'include_stacked_chart_diagram_for_good_quality_components': include_stacked_chart_diagram_for_good_quality_components,
+        'replenish_buffers': replenish_buffers,
+        'include_arrival_variability': include_arrival_variability,
+        'include_demand_variability': include_demand_variability,
+        'discard_at_cleaning_and_inspection': discard_at_cleaning_and_inspection,
+        'event_driven_stations': event_driven_stations,
+        'track_buffer_changes': track_buffer_changes,
+        'keep_buffer_log': keep_buffer_log,
+        'random_numbers': random_numbers,
+        'antithetic': antithetic,
+        'keep_discard_times': keep_discard_times,
+        'detect_warmup': detect_warmup
+    }
+    for buffer_name, capacity in buffer_capacities.items():
+        if capacity is not None:
+            flags[f'{buffer_name}_capacity'] = capacity
+    return flags
 
 
-delayed_request_times = []  # Track timestamps of delayed requests
+def effective_parameters(process_parameters):
+    """Full configuration of a run: the module defaults overridden by process_parameters."""
+    params = default_flags()
+    params.update(copy.deepcopy(process_parameters))
+    return params
 
 
-# Monitoring data
+def get_path(params, path):
+    value = params
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            raise KeyError(f"Unknown parameter path: {path}")
+        value = value[key]
+    return value
 
-buffer_log = []
+
+def set_path(params, path, value):
+    keys = path.split('.')
+    get_path(params, path)  # Only existing parameters can be set (catches typos)
+    target = params
+    for key in keys[:-1]:
+        target = target[key]
+    target[keys[-1]] = value
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
 
 
 # Utility functions
@@ -229,279 +288,340 @@ def log_debug(message):
     if DEBUG:
         print(message)
 
-# Initialize the dictionary at the start of the script
-quality_random_by_process = {
-    'demand_arrival':[],
-    'cores_arrival':[],
-    'cleaning_and_inspection': [],
-    'component_cleaning': [],
-    'component_inspection': [],
-    'component_repair': [],
-    'finished_product_inspection': []
-}
 
-
-
-
-def assign_quality(quality_thresholds, process_name):
-
-    global quality_random_by_process
+def assign_quality(run, quality_thresholds, process_name, entity=(), decision=0):
+    # quality_thresholds: cumulative (Low, Medium) pair; returns LOW, MEDIUM or HIGH
+    quality_random = run.random_numbers.uniform(process_name, 0, 100, entity, decision)
     
-    quality_random = random_generators[process_name].uniform(0, 100)
-    #quality_random_by_process[process_name].append(quality_random)
-    
-    if quality_random <= quality_thresholds['Low']:
-        return "Low"
-    elif quality_random <= quality_thresholds['Medium']:
-        return "Medium"
+    if quality_random <= quality_thresholds[0]:
+        return LOW
+    elif quality_random <= quality_thresholds[1]:
+        return MEDIUM
     else:
-        return "High"
+        return HIGH
     #log_debug(f"[DEBUG] Assigned quality: {quality}")
     return quality_random
 
 
 
 # Processes
-def demand_arrival(env, inspected_finished_products_buffer):
-    global total_requests, fulfilled_requests, delayed_requests, cumulative_delay_time, income, cont
-    params = process_parameters['demand']
-    if env.now < warmup_period:
-        yield env.timeout(warmup_period - env.now)
+def demand_arrival(run, inspected_finished_products_buffer):
+    env = run.env
+    tables = run.tables
+    if env.now < run.warmup_period:
+        yield env.timeout(run.warmup_period - env.now)
     
     while True:
-        if include_demand_variability =='yes':
-            interval = random_generators['demand_arrival'].uniform(
-                params['interval'] * (1 - params['variability']),
-                params['interval'] * (1 + params['variability'])
+        if run.include_demand_variability =='yes':
+            interval = run.random_numbers.uniform(
+                'demand_arrival',
+                tables.demand_interval * (1 - tables.demand_variability),
+                tables.demand_interval * (1 + tables.demand_variability),
+                (run.demand_count,), 0
             )
-            demand_quantity = random_generators['demand_arrival'].randint(
-                params['quantity_min'],
-                params['quantity_max']
+            demand_quantity = run.random_numbers.randint(
+                'demand_arrival',
+                tables.demand_quantity_min,
+                tables.demand_quantity_max,
+                (run.demand_count,), 1
             )
         else:
-            interval = params['interval']
-            demand_quantity = params['quantity_min']
+            interval = tables.demand_interval
+            demand_quantity = tables.demand_quantity_min
         yield env.timeout(interval)
+        run.demand_count += 1
         
-        total_requests += demand_quantity
-        #print(cont, demand_quantity, total_requests)
+        run.total_requests += demand_quantity
+        #print(cont, demand_quantity, run.total_requests)
         #log_debug(f"[DEBUG] Time {env.now}: Demand arrival of {demand_quantity} units. Inspected_finished_products_buffer buffer level: {len(inspected_finished_products_buffer.items)}")
 
-        if len(inspected_finished_products_buffer.items) >= demand_quantity:
-            for _ in range(demand_quantity):
-                yield inspected_finished_products_buffer.get()  # Retrieve one item at a time
-            fulfilled_requests += demand_quantity
-            income =  fulfilled_requests * prize
+        # Orders are served in arrival order: stock goes to the backorders first
+        if not run.backorders and len(inspected_finished_products_buffer.items) >= demand_quantity:
+            yield inspected_finished_products_buffer.get_many(demand_quantity)  # The whole order in one event
+            run.fulfilled_requests += demand_quantity
+            run.income =  run.fulfilled_requests * prize
+            if run.request_traces:
+                run.request_traces['fulfilled_requests'].record(env.now, run.fulfilled_requests)
             #log_debug(f"[DEBUG] Time {env.now}: {demand_quantity} units shipped. Remaining cleaned buffer level: {len(cleaned_buffer.items)}")
         else:
-            delayed_requests += demand_quantity
-            delayed_request_times.extend([env.now] * demand_quantity)
+            run.delayed_requests += demand_quantity
+            if run.request_traces:
+                run.request_traces['delayed_requests'].record(env.now, run.delayed_requests)
             #log_debug(f"[DEBUG] Time {env.now}: Insufficient stock. {demand_quantity} units delayed. inspected_finished_products_buffer: {len(inspected_finished_products_buffer.items)}")
-            
-            while len(inspected_finished_products_buffer.items) < demand_quantity:
-                yield env.timeout(1)
-            
-            for _ in range(demand_quantity):
-                yield inspected_finished_products_buffer.get()  # Retrieve one item at a time
-            fulfillment_time = env.now
-            for _ in range(demand_quantity):
-                delay_time = fulfillment_time - delayed_request_times.pop(0)
-                cumulative_delay_time += delay_time
-            #log_debug(f"[DEBUG] Time {env.now}: LATE SHIPPING: {demand_quantity} units shipped. Remaining inspected_finished_products_buffer: {len(inspected_finished_products_buffer.items)}")
-
-
-
-def update_monitoring_data(env, monitoring_data, 
-                           arrival_buffer, cleaned_buffer, discarded_cores_buffer, 
-                           components_buffer, cleaned_components_buffer, 
-                           good_quality_components_buffer, to_be_repaired_components_buffer, 
-                           discarded_components_buffer, finished_products_buffer, 
-                           inspected_finished_products_buffer, discarded_products_buffer):
-    #print(f"update_monitoring_data called at time {env.now}")
-    monitoring_data['time'].append(env.now)
-    monitoring_data['arrival_buffer_level'].append(len(arrival_buffer.items))
-    monitoring_data['cleaned_buffer_level'].append(len(cleaned_buffer.items))
-    monitoring_data['discarded_cores_buffer_level'].append(len(discarded_cores_buffer.items))
-    monitoring_data['components_buffer_level'].append(len(components_buffer.items))  # Use len() for Store
-    monitoring_data['cleaned_components_buffer_level'].append(len(cleaned_components_buffer.items))  # Use len() for Store
-    monitoring_data['good_quality_components_buffer_level'].append(len(good_quality_components_buffer.items))  # Use len() for Store
-    monitoring_data['to_be_repaired_components_buffer_level'].append(len(to_be_repaired_components_buffer.items))  # Use len() for Store
-    monitoring_data['discarded_components_buffer_level'].append(len(discarded_components_buffer.items))  # Use len() for Store
-    monitoring_data['finished_products_buffer_level'].append(len(finished_products_buffer.items))  # Use len() for Store
-    monitoring_data['inspected_finished_products_buffer_level'].append(len(inspected_finished_products_buffer.items))  # Use len() for Store
-    monitoring_data['discarded_products_buffer_level'].append(len(discarded_products_buffer.items))  # Use len() for Store
-    monitoring_data['fulfilled_requests'].append(fulfilled_requests)
-    monitoring_data['delayed_requests'].append(delayed_requests)
-
-    # Log buffer states
-    log_buffer_state(simulation_time, 'arrival_buffer', arrival_buffer.items)
-    log_buffer_state(simulation_time, 'cleaned_buffer', cleaned_buffer.items)
-    log_buffer_state(simulation_time, 'discarded_cores_buffer', discarded_cores_buffer.items)
-    log_buffer_state(simulation_time, 'components_buffer', components_buffer.items)
-    log_buffer_state(simulation_time, 'cleaned_components_buffer', cleaned_components_buffer.items)
-    log_buffer_state(simulation_time, 'good_quality_components_buffer', good_quality_components_buffer.items)
-    log_buffer_state(simulation_time, 'to_be_repaired_components_buffer', to_be_repaired_components_buffer.items)
-    log_buffer_state(simulation_time, 'discarded_components_buffer', discarded_components_buffer.items)
-    log_buffer_state(simulation_time, 'finished_products_buffer', finished_products_buffer.items)
-    log_buffer_state(simulation_time, 'inspected_finished_products_buffer', inspected_finished_products_buffer.items)
-    log_buffer_state(simulation_time, 'discarded_products_buffer', discarded_products_buffer.items)
+            # La orden pasa a la cola de pedidos pendientes; la demanda sigue llegando
+            run.backorders.append((env.now, demand_quantity))
+            if run.backorder_arrival is not None:
+                run.backorder_arrival.succeed()
+                run.backorder_arrival = None
 
-    
-
-    if include_stacked_chart_diagram_for_good_quality_components == 'yes':
-         # Stacked levels for good quality components
-        component_types = ["Component_A", "Component_B", "Component_C"]
-        good_quality_stacked = {component: 0 for component in component_types}
-        discarded_stacked = {component: 0 for component in component_types}
-    
-        # Update stacked levels for good quality components
-        for item in good_quality_components_buffer.items:
-            component_type = item['type']
-            if component_type in good_quality_stacked:
-                good_quality_stacked[component_type] += 1
-    
-        for component in component_types:
-            key = f'good_quality_{component.lower()}_buffer_level'
-            if key not in monitoring_data:
-                monitoring_data[key] = []
-            monitoring_data[key].append(good_quality_stacked[component])
-    
-        # Update stacked levels for discarded components
-        for item in discarded_components_buffer.items:
-            component_type = item['type']
-            if component_type in discarded_stacked:
-                discarded_stacked[component_type] += 1
-    
-        for component in component_types:
-            key = f'discarded_{component.lower()}_buffer_level'
-            if key not in monitoring_data:
-                monitoring_data[key] = []
-            monitoring_data[key].append(discarded_stacked[component])
-
-
-
-def log_buffer_state(time, buffer_name, buffer_content):
-    buffer_types = {}
-    total_count = 0
-    has_type = any('type' in item for item in buffer_content)  # Check if items have 'type'
 
-    if has_type:
-        # Process items with a 'type'
-        for item in buffer_content:
-            item_type = item.get('type', 'Unknown')  # Use 'Unknown' if 'type' is missing
-            buffer_types[item_type] = buffer_types.get(item_type, 0) + 1
-            total_count += 1
-
-        # Log counts by type
-        for item_type, count in buffer_types.items():
-            log_entry = {'time': time, 'buffer': buffer_name, 'type': item_type, 'count': count}
-            buffer_log.append(log_entry)
-            #print("Logged entry with type:", log_entry)  # Debugging output
+def fill_backorders(run, inspected_finished_products_buffer):
+    # Serves late orders as soon as finished products arrive, oldest first
+    env = run.env
+    backorders = run.backorders
+    while True:
+        if not backorders:
+            run.backorder_arrival = env.event()
+            yield run.backorder_arrival
+        order_time, demand_quantity = backorders[0]
+        # Fires on the put that completes the order
+        yield inspected_finished_products_buffer.get_many(demand_quantity)
+        backorders.popleft()
+        delay = demand_quantity * (env.now - order_time)
+        run.cumulative_delay_time += delay
+        if order_time < run.statistics_start:
+            carry_delay(run, env.now, delay)
+        elif run.detect_warmup == 'yes' and run.warmup_end is None and not run.replaying:
+            # Until the cut is known: needed to tell which orders it leaves in the warmup
+            run.shipment_log.append((env.now, len(run.statistics_marks), order_time, delay))
+        #log_debug(f"[DEBUG] Time {env.now}: LATE SHIPPING: {demand_quantity} units shipped. Remaining inspected_finished_products_buffer: {len(inspected_finished_products_buffer.items)}")
+
+
+def update_monitoring_data(run):
+    if run.replaying:
+        return  # Samples of a replayed prefix come from the replay file (see checkpoint.py)
+    env = run.env
+    good_quality_components_buffer = run.buffers['good_quality_components_buffer']
+    discarded_components_buffer = run.buffers['discarded_components_buffer']
+    # Samples before the end of the warmup would be thrown away: only the statistics are updated
+    recording = run.detect_warmup != 'yes' or run.warmup_end is not None
+
+    if recording:
+        values = [buffer.level for buffer in run.buffers.values()]
+        values += [run.fulfilled_requests, run.delayed_requests]
+        if run.include_stacked_chart_diagram_for_good_quality_components == 'yes':
+            # Stacked levels for good quality and discarded components
+            values.extend(good_quality_components_buffer.count(component) for component in stacked_chart_component_types)
+            values.extend(discarded_components_buffer.count(component) for component in stacked_chart_component_types)
+        run.recorder.record(env.now, *values)
 
+    # Log buffer states
+    for buffer_name, buffer in run.buffers.items():
+        log_buffer_state(run, env.now, buffer_name, buffer, recording)
+
+
+def monitoring_columns(run):
+    # Column order must match the values recorded in update_monitoring_data
+    columns = [f'{buffer_name}_level' for buffer_name in run.buffers]
+    columns += ['fulfilled_requests', 'delayed_requests']
+    if run.include_stacked_chart_diagram_for_good_quality_components == 'yes':
+        columns += [f'good_quality_{component.lower()}_buffer_level' for component in stacked_chart_component_types]
+        columns += [f'discarded_{component.lower()}_buffer_level' for component in stacked_chart_component_types]
+    return columns
+
+
+def log_buffer_state(run, time, buffer_name, buffer, recording=True):
+    keep_log = recording and run.keep_buffer_log == 'yes'
+    if isinstance(buffer, (TypedStore, CountingSink)):
+        # Counts by type
+        for item_type, count in buffer.counts().items():
+            run.buffer_statistics.update(buffer_name, item_type, time, count)
+            if keep_log and count > 0:
+                run.buffer_log.append({'time': time, 'buffer': buffer_name, 'type': item_type, 'count': count})
+
+    # Aggregate count for the buffer
+    run.buffer_statistics.update(buffer_name, 'All', time, buffer.level)
+    if keep_log:
+        run.buffer_log.append({'time': time, 'buffer': buffer_name, 'type': 'All', 'count': buffer.level})
+
+
+def traced_monitoring_data(run, end_time):
+    # Change-triggered step series: every entry is a (times, levels) pair
+    monitoring_data = {f'{name}_level': buffer.trace.arrays(end_time) for name, buffer in run.buffers.items()}
+    for name, trace in run.request_traces.items():
+        monitoring_data[name] = trace.arrays(end_time)
+    if run.include_stacked_chart_diagram_for_good_quality_components == 'yes':
+        for prefix, buffer in [('good_quality', run.buffers['good_quality_components_buffer']),
+                               ('discarded', run.buffers['discarded_components_buffer'])]:
+            for component in stacked_chart_component_types:
+                trace = buffer.type_traces.get(component) or buffer.trace.zeros()
+                monitoring_data[f'{prefix}_{component.lower()}_buffer_level'] = trace.arrays(end_time)
+    return monitoring_data
+
+
+def drain_monitoring_data(run):
+    # Only the samples (or level changes) recorded since the previous call;
+    # the recorder and the traces forget them
+    if run.track_buffer_changes != 'yes':
+        return run.recorder.drain()
+    monitoring_data = {f'{name}_level': buffer.trace.drain() for name, buffer in run.buffers.items()}
+    for name, trace in run.request_traces.items():
+        monitoring_data[name] = trace.drain()
+    if run.include_stacked_chart_diagram_for_good_quality_components == 'yes':
+        for prefix, buffer in [('good_quality', run.buffers['good_quality_components_buffer']),
+                               ('discarded', run.buffers['discarded_components_buffer'])]:
+            for component in stacked_chart_component_types:
+                trace = buffer.type_traces.get(component)
+                changes = trace.drain() if trace else (np.empty(0), np.empty(0, dtype=np.int64))
+                monitoring_data[f'{prefix}_{component.lower()}_buffer_level'] = changes
+    return monitoring_data
+
+
+def traced_buffer_summary(run, end_time):
+    # Exact time-weighted summaries from the change-triggered step series
+    rows = []
+    for name, buffer in run.buffers.items():
+        traces = [('All', buffer.trace)]
+        if isinstance(buffer, (TypedStore, CountingSink)):
+            traces += list(buffer.type_traces.items())
+        for item_type, trace in traces:
+            rows.append({'buffer': name, 'type': item_type, **trace.summary(end_time)})
+    return sorted(rows, key=lambda row: (row['buffer'], row['type']))
+
+
+def level_traces(run):
+    traces = list(run.request_traces.values())
+    for buffer in run.buffers.values():
+        traces.append(buffer.trace)
+        traces.extend(getattr(buffer, 'type_traces', {}).values())
+    return traces
+
+
+def carry_delay(run, time, delay):
+    # Delay of an order placed before statistics_start: it belongs to the warmup
+    run.carried_delays.append((time, delay))
+    run.carried_delay_time += delay
+
+
+def mark_statistics(run):
+    # Posible final del warmup: guardar el estado de las estadísticas
+    now = run.env.now
+    run.statistics_marks.append((now, {name: getattr(run, name) for name in STATISTICS_COUNTERS}))
+    if run.track_buffer_changes == 'yes':
+        for trace in level_traces(run):
+            trace.mark(now)
+    else:
+        run.buffer_statistics.mark(now)
+
+
+def start_statistics(run, time):
+    # KPIs and summaries cover only the time since the mark at `time`; the
+    # series and the buffer log start now, nothing was recorded before
+    index = [mark_time for mark_time, _ in run.statistics_marks].index(time)
+    run.statistics_baseline = run.statistics_marks[index][1]
+    run.statistics_start = time
+    # Orders placed before the mark and shipped after it
+    for shipped, marks_taken, order_time, delay in run.shipment_log:
+        if marks_taken > index and order_time < time:
+            carry_delay(run, shipped, delay)
+    run.shipment_log = []
+    run.statistics_marks = []
+    if run.track_buffer_changes == 'yes':
+        for trace in level_traces(run):
+            trace.rebase(time)
     else:
-        # Handle buffers without types
-        total_count = len(buffer_content)  # Just count items in the buffer
-
-    # Log aggregate count for the buffer
-    aggregate_log_entry = {'time': time, 'buffer': buffer_name, 'type': 'All', 'count': total_count}
-    buffer_log.append(aggregate_log_entry)
-    #print("Logged aggregate entry:", aggregate_log_entry)
-
-
-def periodic_monitoring(env, 
-                        arrival_buffer, 
-                        cleaned_buffer, 
-                        discarded_cores_buffer, 
-                        components_buffer, 
-                        cleaned_components_buffer, 
-                        good_quality_components_buffer, 
-                        to_be_repaired_components_buffer, 
-                        discarded_components_buffer, 
-                        finished_products_buffer, 
-                        inspected_finished_products_buffer, 
-                        discarded_products_buffer, 
-                        monitoring_data):
+        run.buffer_statistics.rebase(time)
+
+
+def warmup_min_samples(run):
+    # Samples spanning warmup_detection_cycles cycles of the slowest input
+    cycle = max(run.tables.demand_interval, run.tables.arrival_interval)
+    return warmup_detection_cycles * cycle / run.monitoring_interval
+
+
+def warmup_detection(run):
+    # Muestrea los niveles de los buffers desde warmup_period y, en cada punto
+    # de control, marca las estadísticas y aplica MSER-5. Al detectarse el
+    # final del warmup las estadísticas empiezan en la primera marca posterior
+    env = run.env
+    buffers = [run.buffers[buffer_name] for buffer_name in warmup_detection_buffers]
+    if env.now < run.warmup_period:
+        yield env.timeout(run.warmup_period - env.now)
+    if not run.replaying:
+        mark_statistics(run)
+    while run.warmup_end is None:
+        detector = run.warmup_detector  # Replaced when a saved run is resumed (checkpoint.py)
+        if not run.replaying and detector.add([buffer.level for buffer in buffers]):
+            mark_statistics(run)
+            truncation = detector.truncation()
+            if truncation is not None:
+                time = run.statistics_marks[math.ceil(truncation / detector.check_batches)][0]
+                start_statistics(run, time)
+                run.warmup_end = time
+                return
+        yield env.timeout(run.monitoring_interval)
+
+
+def periodic_monitoring(run):
     while True:
         # Monitor the state of each buffer
-        #print(f"periodic_monitoring running at time {env.now}")
-        update_monitoring_data(env, monitoring_data, 
-                               arrival_buffer, cleaned_buffer, discarded_cores_buffer, 
-                               components_buffer, cleaned_components_buffer, 
-                               good_quality_components_buffer, to_be_repaired_components_buffer, 
-                               discarded_components_buffer, finished_products_buffer, 
-                               inspected_finished_products_buffer, discarded_products_buffer)
-        
+        update_monitoring_data(run)
+
         # Pause for the monitoring interval
-        yield env.timeout(1)  # Adjust this to your desired interval
+        yield run.env.timeout(run.monitoring_interval)
 
 
-def cores_arrival(env, arrival_buffer):
-    global core_adquisition_cost
+def cores_arrival(run, arrival_buffer):
+    env = run.env
     
-    params = process_parameters['cores_arrival']
+    tables = run.tables
     while True:
-        if include_arrival_variability == 'yes':                   
-            arrival_interval = random_generators['cores_arrival'].uniform(
-                params['interval'] * (1 - params['variability']),
-                params['interval'] * (1 + params['variability'])
+        if run.include_arrival_variability == 'yes':                   
+            arrival_interval = run.random_numbers.uniform(
+                'cores_arrival',
+                tables.arrival_interval * (1 - tables.arrival_variability),
+                tables.arrival_interval * (1 + tables.arrival_variability),
+                (run.arrival_count,), 0
             )
-            batch_size = random_generators['cores_arrival'].randint(
-                params['batch_size_min'],
-                params['batch_size_max']
+            batch_size = run.random_numbers.randint(
+                'cores_arrival',
+                tables.arrival_batch_min,
+                tables.arrival_batch_max,
+                (run.arrival_count,), 1
             )
         else:
-            arrival_interval = params['interval']
-            batch_size=math.floor((params['batch_size_min']+params['batch_size_max'])/2)
+            arrival_interval = tables.arrival_interval
+            batch_size=math.floor((tables.arrival_batch_min+tables.arrival_batch_max)/2)
         yield env.timeout(arrival_interval)
+        run.arrival_count += 1
         # Add cores as individual items to the buffer
-        batch = [{'core_id': i} for i in range(batch_size)]  # Create batch as a list of items
-        for core in batch:
-            arrival_buffer.put(core)  # Add each core individually
-            core_adquisition_cost += core_adquisition
+        batch = [Core(run.core_count + i, env.now) for i in range(batch_size)]  # Create batch as a list of items
+        run.core_count += batch_size
+        arrival_buffer.put_many(batch)  # The whole batch arrives in one event
+        run.core_adquisition_cost += core_adquisition * batch_size
         #log_debug(f"[DEBUG] Time {env.now}: Added {params['batch_size']} cores to arrival buffer. Current cores level: {len(arrival_buffer.items)}")
 
-def cleaning_and_inspection(env, arrival_buffer, cleaned_buffer, discarded_cores_buffer, resource):
-    params = process_parameters['cleaning_and_inspection']
-    global cumulative_work_hours
+def cleaning_and_inspection(run, arrival_buffer, cleaned_buffer, discarded_cores_buffer, resource):
+    env = run.env
+    tables = run.tables
+    batch_size = tables.cleaning_batch_size
     while True:
         with resource.request() as request:
             yield request
-            if len(arrival_buffer.items) >= params['batch_size']:
+            if run.event_driven_stations == 'yes':
+                yield arrival_buffer.wait_for(batch_size)
+            if len(arrival_buffer.items) >= batch_size:
                 #Log the state of the arrival buffer
                 #log_debug(f"[DEBUG] Time {env.now}: Arrival buffer level before taking batch: {len(arrival_buffer.items)}.")
                 
                 # Collect a batch of items from the arrival buffer
-                batch = []
-                for _ in range(params['batch_size']):
-                    item = yield arrival_buffer.get()
-                    # Ensure item is a dictionary; if not, create one
-                    if not isinstance(item, dict):
-                        item = {'cores_general_condition': None}
-                    batch.append(item)
+                batch = yield arrival_buffer.get_many(batch_size)
 
                 #Log the state after taking the batch
                 #log_debug(f"[DEBUG] Time {env.now}: Arrival buffer level after taking batch: {len(arrival_buffer.items)}.")
 
                 # Assign quality and determine process time for each item
                 for item in batch:
-                    item['cores_general_condition'] = assign_quality(params['quality_thresholds'], 'cleaning_and_inspection')
+                    item.condition = assign_quality(run, tables.cleaning_thresholds, 'cleaning_and_inspection', (item.core_id,))
                 
-                process_times = [params['process_times'][item['cores_general_condition']] for item in batch]
+                process_times = [tables.cleaning_times[item.condition] for item in batch]
                 max_process_time = max(process_times)
 
-                #log_debug(f"[DEBUG] Time {env.now}: Batch taken for cleaning with qualities {[item['cores_general_condition'] for item in batch]} and max process time {max_process_time}.")
+                #log_debug(f"[DEBUG] Time {env.now}: Batch taken for cleaning with qualities {[item.condition for item in batch]} and max process time {max_process_time}.")
                 
                 yield env.timeout(max_process_time)
-                cumulative_work_hours += (max_process_time/60)
+                run.cumulative_work_hours += (max_process_time/60)
 
                 # Add cleaned items to the cleaned buffer
+                cleaned = []
                 for item in batch:
-                    if item['cores_general_condition']=='Low' and discard_at_cleaning_and_inspection == 'yes':
+                    if item.condition==LOW and run.discard_at_cleaning_and_inspection == 'yes':
                         discarded_cores_buffer.put(item)
-                        #print(f"Condición general del core: {item['cores_general_condition']}, Descarte en la fase limpieza e inspección: {discard_at_cleaning_and_inspection}, Buffer de componentes limpios: {len(cleaned_buffer.items)}, Buffer de componentes desechados: {len(discarded_cores_buffer.items)}")
+                        #print(f"Condición general del core: {item.condition}, Descarte en la fase limpieza e inspección: {run.discard_at_cleaning_and_inspection}, Buffer de componentes limpios: {len(cleaned_buffer.items)}, Buffer de componentes desechados: {len(discarded_cores_buffer.items)}")
                     else:
-                        cleaned_buffer.put(item)
-                        #print(f"Condición general del core: {item['cores_general_condition']}, Descarte en la fase limpieza e inspección: {discard_at_cleaning_and_inspection}, Buffer de componentes limpios: {len(cleaned_buffer.items)}, Buffer de componentes desechados: {len(discarded_cores_buffer.items)}")
+                        cleaned.append(item)
+                if cleaned:
+                    cleaned_buffer.put_many(cleaned)
 
                 #log_debug(f"[DEBUG] Time {env.now}: Batch added to cleaned buffer. Cleaned buffer level: {len(cleaned_buffer.items)}.")
             else:
@@ -510,62 +630,61 @@ def cleaning_and_inspection(env, arrival_buffer, cleaned_buffer, discarded_cores
 
 
 
-def disassembly(env, cleaned_buffer, components_buffer, resource):
-    params = process_parameters['disassembly']  # Retrieve process parameters
-    bom = process_parameters['bill_of_materials']
-    global cumulative_work_hours
+def disassembly(run, cleaned_buffer, components_buffer, resource):
+    env = run.env
+    tables = run.tables  # Retrieve compiled process parameters
+    batch_size = tables.disassembly_batch_size
+    component_types = tables.component_types
     while True:
         with resource.request() as request:
             yield request
-            if len(cleaned_buffer.items) >= params['batch_size']:
-                # Collect the batch using a loop
-                batch = []
-                for _ in range(params['batch_size']):
-                    core_data = yield cleaned_buffer.get()
-                    batch.append(core_data)
+            if run.event_driven_stations == 'yes':
+                yield cleaned_buffer.wait_for(batch_size)
+            if len(cleaned_buffer.items) >= batch_size:
+                # Collect the batch
+                batch = yield cleaned_buffer.get_many(batch_size)
 
                 # Extract qualities and determine the maximum process time
-                cores_general_conditions = [core_data['cores_general_condition'] for core_data in batch]  # Extract qualities
-                process_times = [params['process_time'][cores_general_condition] for cores_general_condition in cores_general_conditions]  # Get process times
+                cores_general_conditions = [core_data.condition for core_data in batch]  # Extract qualities
+                process_times = [tables.disassembly_times[cores_general_condition] for cores_general_condition in cores_general_conditions]  # Get process times
                 max_process_time = max(process_times)  # Take the longest process time
 
                 #log_debug(f"[DEBUG] Time {env.now}: Disassembling a batch with qualities {qualities}. Max process time: {max_process_time}.")
                 yield env.timeout(max_process_time)
-                cumulative_work_hours += (max_process_time/60)
+                run.cumulative_work_hours += (max_process_time/60)
 
                 # Add components to the components buffer based on the bill of materials
-                for core_data in batch:
-                    for component, quantity in bom.items():
-                        for _ in range(quantity):
-                            components_buffer.put({'type': component, 'quantity': 1})
-                            #log_debug(f"[DEBUG] Time {env.now}: Added 1 of {component} to components buffer. Buffer updated.")
+                # La posición del componente dentro del core identifica la entidad
+                components = [Component(component_types[code], code, (core_data.core_id, position), env.now)
+                              for core_data in batch for position, code in enumerate(tables.bom_items)]
+                if components:
+                    components_buffer.put_many(components)
             else:
                 yield env.timeout(1)
 
 
 
-def component_cleaning(env, components_buffer, cleaned_components_buffer, resource):
-    params = process_parameters['component_cleaning']
-    quality_thresholds = params['quality_thresholds']
-    global cumulative_work_hours
+def component_cleaning(run, components_buffer, cleaned_components_buffer, resource):
+    env = run.env
+    tables = run.tables
+    batch_size = tables.component_cleaning_batch_size
+    quality_thresholds = tables.component_cleaning_thresholds
+    process_times_table = tables.component_cleaning_times
     while True:
         with resource.request() as request:
             yield request
-            if len(components_buffer.items) >= params['batch_size']:
+            if run.event_driven_stations == 'yes':
+                yield components_buffer.wait_for(batch_size)
+            if components_buffer.level >= batch_size:
                 # Collect the batch
-                batch = []
-                for _ in range(params['batch_size']):
-                    component_data = yield components_buffer.get()
-                    #log_debug(f"[DEBUG] Time {env.now}: Number of parts in the components buffer: {len(components_buffer.items)}.")
-                    batch.append(component_data)
+                batch = yield components_buffer.get_many(batch_size)
                 
                 # Extract process times for all components in the batch
                 process_times = []
                 for component_data in batch:
-                    component = component_data['type']
-                    component_general_condition = assign_quality(quality_thresholds, 'component_cleaning')
-                    component_data['component_general_condition'] = component_general_condition
-                    process_time = params['process_times'][component][component_general_condition]
+                    component_general_condition = assign_quality(run, quality_thresholds, 'component_cleaning', component_data.entity)
+                    component_data.condition = component_general_condition
+                    process_time = process_times_table[component_data.code * 3 + component_general_condition]
                     process_times.append(process_time)
                     #log_debug(f"[DEBUG] Time {env.now}: Cleaning {component} with quality '{quality}' (process time {process_time}).")
                 
@@ -573,82 +692,59 @@ def component_cleaning(env, components_buffer, cleaned_components_buffer, resour
                 max_process_time = max(process_times)
                 #log_debug(f"[DEBUG] Time {env.now}: Batch cleaning will take {max_process_time}.")
                 yield env.timeout(max_process_time)
-                cumulative_work_hours += (max_process_time/60)
+                run.cumulative_work_hours += (max_process_time/60)
 
                 # Add cleaned items to the cleaned_components_buffer
-                for component_data in batch:
-                    cleaned_components_buffer.put(component_data)
-                    #log_debug(f"[DEBUG] Time {env.now}: Cleaned {component_data['type']}. Cleaned components buffer updated.")
-                    #log_debug(f"[DEBUG] Time {env.now}: Number of parts in the cleaned components buffer: {len(cleaned_components_buffer.items)}.")
+                cleaned_components_buffer.put_many(batch)
             else:
                 #log_debug(f"[DEBUG] Time {env.now}: Not enough parts in the components buffer for a batch. Waiting...")
                 yield env.timeout(1)
 
 
-def component_inspection(env, cleaned_components_buffer, good_quality_components_buffer, to_be_repaired_components_buffer, discarded_components_buffer, resource):
-    params = process_parameters['component_inspection']
-    global cumulative_work_hours
+def component_inspection(run, cleaned_components_buffer, good_quality_components_buffer, to_be_repaired_components_buffer, discarded_components_buffer, resource):
+    env = run.env
+    tables = run.tables
+    batch_sizes = tables.inspection_batch_size
 
     while True:
         with resource.request() as request:
             yield request
-
-            # Check if there are enough components for a batch
-            batch_ready = False
-            while not batch_ready:
-                component_counts = {}
-                for component_data in cleaned_components_buffer.items:
-                    component_type = component_data['type']
-                    component_general_condition = component_data['component_general_condition']
-                    component_counts[component_type] = component_counts.get(component_type, 0) + 1
-
-                # Check if any component type meets the batch size requirement
-                for component_type, count in component_counts.items():
-                    if count >= params['batch_size'][component_type]:
-                        batch_ready = True
-                        selected_type = component_type
-                        break
-
-                if not batch_ready:
-                    #log_debug(f"[DEBUG] Time {env.now}: Not enough components for a batch. Cleaned components buffer level: {len(cleaned_components_buffer.items)}. Waiting...")
+            if run.event_driven_stations == 'yes':
+                # Sleep until some component type has a full batch
+                batch = yield cleaned_components_buffer.get_batch(batch_sizes)
+            else:
+                # Check if there are enough components for a batch
+                selected_type = cleaned_components_buffer.ready_type(batch_sizes)
+                while selected_type is None:
+                    #log_debug(f"[DEBUG] Time {env.now}: Not enough components for a batch. Cleaned components buffer level: {cleaned_components_buffer.level}. Waiting...")
                     yield env.timeout(1)
+                    selected_type = cleaned_components_buffer.ready_type(batch_sizes)
 
-            # Collect the batch
-            batch = []
-            #log_debug(f"[DEBUG] Time {env.now}: Collecting batch of type '{selected_type}'. Initial cleaned components buffer level: {len(cleaned_components_buffer.items)}.")
-            while len(batch) < params['batch_size'][selected_type]:
-                for idx, component_data in enumerate(cleaned_components_buffer.items):
-                    if component_data['type'] == selected_type:
-                        component = yield cleaned_components_buffer.get()
-                        batch.append(component)
-                        #log_debug(f"[DEBUG] Time {env.now}: Taken 1 component of type '{selected_type}' from cleaned components buffer. Current level: {len(cleaned_components_buffer.items)}.")
-                        if len(batch) == params['batch_size'][selected_type]:
-                            break
-
-            #log_debug(f"[DEBUG] Time {env.now}: Batch of {len(batch)} components of type '{selected_type}' collected for inspection. Cleaned components buffer level after batch collection: {len(cleaned_components_buffer.items)}.")
+                # Collect the batch
+                batch = yield cleaned_components_buffer.get_type(selected_type, batch_sizes[selected_type])
+            selected_type = batch[0].type
+            row = batch[0].code * 3  # Fila del tipo seleccionado en las tablas por componente
 
             # Process the batch
-            component_general_conditions = [component_general_condition for core_data in batch]
-            #qualities = [assign_quality(params['quality_thresholds'][component_type]) for _ in batch]
-            process_times = [params['process_times'][selected_type][component_general_condition] for component_general_condition in component_general_conditions]
+            process_times = [tables.inspection_times[row + component_data.condition] for component_data in batch]
             max_process_time = max(process_times)
             #log_debug(f"[DEBUG] Time {env.now}: Batch inspection will take {max_process_time} units of time.")
             yield env.timeout(max_process_time)
-            cumulative_work_hours += (max_process_time)/60
-            component_qualities = [assign_quality(params['quality_thresholds'][component_type][component_general_condition],'component_inspection') for _ in batch]
+            run.cumulative_work_hours += (max_process_time)/60
+            component_qualities = [assign_quality(run, tables.inspection_thresholds[row + component_data.condition],'component_inspection', component_data.entity) for component_data in batch]
 
 
             # Assign components to their final buffers
             for idx, component_data in enumerate(batch):
                 component_quality = component_qualities[idx]
-                if component_quality == "High":
+                if component_quality == HIGH:
                     buffer = good_quality_components_buffer
-                elif component_quality == "Medium":
+                elif component_quality == MEDIUM:
                     buffer = to_be_repaired_components_buffer
                 else:
                     buffer = discarded_components_buffer
 
-                buffer.put({'type': selected_type, 'quantity': 1})
+                buffer.put(component_data)
                 #log_debug(f"[DEBUG] Time {env.now}: Moved 1 component of type '{selected_type}' with quality '{quality}' to the appropriate buffer.")
                 #log_debug(f"[DEBUG] Time {env.now}: Buffer levels -> High: {len(good_quality_components_buffer.items)}, Medium: {len(to_be_repaired_components_buffer.items)}, Low: {len(discarded_components_buffer.items)}.")
 
@@ -657,10 +753,9 @@ def component_inspection(env, cleaned_components_buffer, good_quality_components
 
 
 
-def component_repair(env, to_be_repaired_components_buffer, good_quality_components_buffer, discarded_components_buffer, resource, resource_id):
-    params = process_parameters['component_repair']  # Acceder a los parámetros actualizados
-    max_attempts = params['max_repair_attempts']  # Máximo número de intentos
-    global cumulative_work_hours
+def component_repair(run, to_be_repaired_components_buffer, good_quality_components_buffer, discarded_components_buffer, resource, resource_id):
+    env = run.env
+    tables = run.tables  # Acceder a los parámetros compilados
 
     while True:
         with resource.request() as request:
@@ -670,24 +765,29 @@ def component_repair(env, to_be_repaired_components_buffer, good_quality_compone
             #log_debug(f"[DEBUG] Time {env.now}: Starting repair process on resource {resource_id}.")
             #log_debug(f"[DEBUG] Time {env.now}: Pre-process buffer levels -> To Be Repaired: {len(to_be_repaired_components_buffer.items)}, Good Quality: {len(good_quality_components_buffer.items)}, Discarded: {len(discarded_components_buffer.items)}.")
 
+            if run.event_driven_stations == 'yes':
+                yield to_be_repaired_components_buffer.wait_for(1)
+
             # Revisar si hay componentes en el buffer
-            if len(to_be_repaired_components_buffer.items) > 0:
+            if to_be_repaired_components_buffer.level > 0:
                 # Obtener un componente del buffer
                 component_data = yield to_be_repaired_components_buffer.get()
-                component_type = component_data['type']
-                repair_attempts = component_data.get('repair_attempts', 0) + 1
+                code = component_data.code
+                component_data.repair_attempts += 1
+                repair_attempts = component_data.repair_attempts
 
                 #log_debug(f"[DEBUG] Time {env.now}: Resource {resource_id} repairing '{component_type}' (Attempt {repair_attempts}/{max_attempts}).")
 
                 # Calcular tiempo de reparación
-                easiness_to_repair = assign_quality(params['easiness_to_repair_thresholds'][component_type], 'component_repair')
+                easiness_to_repair = assign_quality(run, tables.repair_easiness_thresholds[code], 'component_repair',
+                                                    component_data.entity, 2 * repair_attempts - 2)
 
-                process_time = params['process_times'][component_type][easiness_to_repair]
+                process_time = tables.repair_times[code * 3 + easiness_to_repair]
                 #process_time = params['process_times'].get(component_type, {}).get(easiness_to_repair, 0)
                 #st.write(f"Tiempo de proceso para {component_type} con {easiness_to_repair}: {process_time}")
 
                 yield env.timeout(process_time)
-                cumulative_work_hours += process_time / 60
+                run.cumulative_work_hours += process_time / 60
 
                 # Determinar calidad final
                 #st.write("Contenido de params['quality_thresholds']:", params['quality_thresholds'])
@@ -702,19 +802,20 @@ def component_repair(env, to_be_repaired_components_buffer, good_quality_compone
                 #else:
                 #    st.write(f"Error: '{component_type}' no encontrado en quality_thresholds.")
 
-                quality = assign_quality(params['quality_thresholds'][component_type][easiness_to_repair], 'component_repair')
+                quality = assign_quality(run, tables.repair_thresholds[code * 3 + easiness_to_repair], 'component_repair',
+                                         component_data.entity, 2 * repair_attempts - 1)
                 #log_debug(f"[DEBUG] Time {env.now}: Repair completed on resource {resource_id} for '{component_type}'. Final quality: '{quality}'.")
 
                 # Determinar el buffer final
-                if quality == "High":
+                if quality == HIGH:
                     buffer = good_quality_components_buffer
-                elif repair_attempts >= max_attempts or quality == "Low":
+                elif repair_attempts >= tables.max_repair_attempts or quality == LOW:
                     buffer = discarded_components_buffer
                 else:
                     buffer = to_be_repaired_components_buffer
 
                 # Guardar el componente en el buffer final
-                buffer.put({'type': component_type, 'quantity': 1, 'repair_attempts': repair_attempts})
+                buffer.put(component_data)
 
                 # Depuración: Niveles de buffers después del proceso
                 #log_debug(f"[DEBUG] Time {env.now}: Post-process buffer levels -> To Be Repaired: {len(to_be_repaired_components_buffer.items)}, Good Quality: {len(good_quality_components_buffer.items)}, Discarded: {len(discarded_components_buffer.items)}.")
@@ -723,61 +824,49 @@ def component_repair(env, to_be_repaired_components_buffer, good_quality_compone
 
 
 
-def assembly(env, good_quality_components_buffer, finished_products_buffer, assembly_resource):
-    params = process_parameters['assembly']
-    bom = process_parameters['bill_of_materials']  # Referencia al BOM
-    replenishment_params = process_parameters['replenishment']  # Umbrales de reposición
-    global cumulative_work_hours, last_request_time
+def assembly(run, good_quality_components_buffer, finished_products_buffer, assembly_resource):
+    env = run.env
+    tables = run.tables
+    bom = tables.bom  # Referencia al BOM
+    process_time = tables.assembly_time
 
     while True:
         with assembly_resource.request() as request:
             yield request
-
-            # Depuración: Nivel inicial de buffers
-            #log_debug(f"[DEBUG] Time {env.now}: Starting assembly process.")
-            component_counts = {component: len([item for item in good_quality_components_buffer.items if item['type'] == component]) for component in process_parameters['bill_of_materials']}
-            #log_debug(f"[DEBUG] Time {env.now}: Pre-process buffer levels -> Good Quality Components: {component_counts}, Finished Products: {len(finished_products_buffer.items)}.")
-
             # Verificar si hay suficientes componentes en el buffer
-            if all(len([item for item in good_quality_components_buffer.items if item['type'] == component]) >= quantity
-                   for component, quantity in bom.items()):
-
-                # Depuración: Verificar si hay suficientes componentes
-                #log_debug(f"[DEBUG] Time {env.now}: Enough components available for assembly.")
-                #log_debug(f"[DEBUG] Time {env.now}: Components required: {bom}.")
+            if run.event_driven_stations == 'yes' or good_quality_components_buffer.has_kit(bom):
 
                 # Tomar componentes necesarios para ensamblar un producto
-                for component, quantity in bom.items():
-                    for _ in range(quantity):
-                        component_data = next(item for item in good_quality_components_buffer.items if item['type'] == component)
-                        good_quality_components_buffer.items.remove(component_data)
-                        #log_debug(f"[DEBUG] Time {env.now}: Took one '{component}' from good_quality_components_buffer. Remaining: {len([item for item in good_quality_components_buffer.items if item['type'] == component])}.")
+                # (en modo event-driven espera hasta que el kit completo esté disponible)
+                yield good_quality_components_buffer.get_kit(bom)
 
                 # Verificar y activar reposición si es necesario
-                time_since_last_request = env.now - last_request_time
-                for component, threshold in replenishment_params['thresholds'].items():
-                    current_level = sum(1 for item in good_quality_components_buffer.items if item['type'] == component)
+                time_since_last_request = env.now - run.last_request_time
+                for component, threshold, _ in tables.replenishment:  # Umbrales de reposición
+                    current_level = good_quality_components_buffer.count(component)
                     #print(f" Current level{current_level}")
                     #print(f" Threshold{threshold}")
                     #print(f"Condition 1_ {current_level < threshold}")
                     #print(f"Time since last request {time_since_last_request}")
-                    #print(f"Condition 2_ {env.now > warmup_period}")
+                    #print(f"Condition 2_ {env.now > run.warmup_period}")
                     #print(f"Condition 3_ {time_since_last_request > 1440}")
-                    if (current_level < threshold and 
-                        env.now > warmup_period and 
-                        time_since_last_request > replenishment_params['interval']):  # Supongamos que X = 50 unidades de tiempo
+                    if (run.replenish_buffers == 'yes' and
+                        current_level < threshold and 
+                        env.now > run.warmup_period and 
+                        time_since_last_request > tables.replenishment_interval):  # Supongamos que X = 50 unidades de tiempo
                         #log_debug(f"[DEBUG] Time {env.now}: Replenishing '{component}' as its level {current_level} is below threshold {threshold}.")
-                        env.process(replenish_good_quality_components(env, good_quality_components_buffer))
-                        last_request_time = env.now
+                        env.process(replenish_good_quality_components(run, good_quality_components_buffer))
+                        run.last_request_time = env.now
                         break  # Salir del bucle tras activar el proceso de reposición
 
                 # Procesar el ensamblaje
-                #log_debug(f"[DEBUG] Time {env.now}: Assembling product. Assembly time: {params['process_time']} units.")
-                yield env.timeout(params['process_time'])
-                cumulative_work_hours += (params['process_time'] / 60)
+                #log_debug(f"[DEBUG] Time {env.now}: Assembling product. Assembly time: {process_time} units.")
+                yield env.timeout(process_time)
+                run.cumulative_work_hours += (process_time / 60)
 
                 # Añadir el producto ensamblado al buffer de productos terminados
-                finished_products_buffer.put({'product': 'assembled_product'})
+                finished_products_buffer.put(Product(run.product_count, env.now))
+                run.product_count += 1
                 #log_debug(f"[DEBUG] Time {env.now}: Product assembled and moved to finished_products_buffer.")
                 #log_debug(f"[DEBUG] Time {env.now}: Product in the finished products buffer: {len(finished_products_buffer.items)}")
 
@@ -790,9 +879,9 @@ def assembly(env, good_quality_components_buffer, finished_products_buffer, asse
 
 
 
-def finished_product_inspection(env, finished_products_buffer, inspected_finished_products_buffer, discarded_products_buffer, resource):
-    params = process_parameters['finished_product_inspection']
-    global cumulative_work_hours
+def finished_product_inspection(run, finished_products_buffer, inspected_finished_products_buffer, discarded_products_buffer, resource):
+    env = run.env
+    tables = run.tables
 
 
     while True:
@@ -803,24 +892,28 @@ def finished_product_inspection(env, finished_products_buffer, inspected_finishe
             #log_debug(f"[DEBUG] Time {env.now}: Finished products buffer level before inspection: {len(finished_products_buffer.items)}.")
             #log_debug(f"[DEBUG] Time {env.now}: Discarded products buffer level: {len(discarded_products_buffer.items)}.")
 
+            if run.event_driven_stations == 'yes':
+                yield finished_products_buffer.wait_for(1)
+
             # Check if there are parts in the finished products buffer
             if len(finished_products_buffer.items) > 0:
                 product_data = yield finished_products_buffer.get()
-                quality = assign_quality(params['quality_thresholds'], 'finished_product_inspection')
-                process_time = params['process_time']
+                quality = assign_quality(run, tables.product_inspection_thresholds, 'finished_product_inspection',
+                                         (product_data.product_id,))
+                process_time = tables.product_inspection_time
 
                 #log_debug(f"[DEBUG] Time {env.now}: Inspecting finished product with quality '{quality}' (fixed process time: {process_time}).")
 
                 # Perform the inspection
                 yield env.timeout(process_time)
-                cumulative_work_hours += (process_time/60)
+                run.cumulative_work_hours += (process_time/60)
 
 
                 # Route the product based on quality
-                if quality == "High":
+                if quality == HIGH:
                     inspected_finished_products_buffer.put(product_data)
                     #log_debug(f"[DEBUG] Time {env.now}: Moved finished product to inspected_finished_products_buffer. Level: {len(inspected_finished_products_buffer.items)}.")
-                elif quality == "Medium":
+                elif quality == MEDIUM:
                     discarded_products_buffer.put(product_data)
                     #log_debug(f"[DEBUG] Time {env.now}: Moved finished product to discarded_products_buffer. Level: {len(discarded_products_buffer.items)}.")
                 else:  # quality == "Low"
@@ -830,289 +923,344 @@ def finished_product_inspection(env, finished_products_buffer, inspected_finishe
                 #log_debug(f"[DEBUG] Time {env.now}: No finished products to inspect. Waiting...")
                 yield env.timeout(1)
 
-def replenish_good_quality_components(env, good_quality_components_buffer):
-    global buyed_components_cost
-    params = process_parameters['replenishment']
-    component_types = params['component_types']
-    thresholds = params['thresholds']
-    replenishment_batch = params['replenishment_batch']
+def replenish_good_quality_components(run, good_quality_components_buffer):
+    env = run.env
+    tables = run.tables
     #print(f"Time:{env.now}, empieza el replenishement")
 
-    for component in thresholds:  # Iterate through all components in the thresholds
-        current_count = len([x for x in good_quality_components_buffer.items if x['type'] == component])
-        if current_count < thresholds[component]:
+    for component, threshold, replenishment_batch in tables.replenishment:  # Iterate through all components in the thresholds
+        current_count = good_quality_components_buffer.count(component)
+        if current_count < threshold:
             # Execute logic when the specific component type is below the threshold
             #print(f"Replenishing {component} as it is below the threshold.")
             # Si el nivel está por debajo del umbral, reponer
-            batch = [{'type': component, 'component_quality': 'High'} for _ in range(replenishment_batch[component])]
-            yield env.timeout(params['interval'])
-            for item in batch:
-                #yield env.timeout(params['interval'])
-                #log_debug(f"[DEBUG] Time {env.now}: Replenished {replenishment_batch[component]} units of '{component}' to good_quality_components_buffer. Current level: {replenishment_batch[component]}.")
-                buyed_components_cost += component_adquisition
-                good_quality_components_buffer.put(item)
+            batch = [Component(component, tables.component_code.get(component, -1), (), env.now, condition=HIGH)
+                     for _ in range(replenishment_batch)]
+            yield env.timeout(tables.replenishment_interval)
+            #log_debug(f"[DEBUG] Time {env.now}: Replenished {replenishment_batch[component]} units of '{component}' to good_quality_components_buffer. Current level: {replenishment_batch[component]}.")
+            run.buyed_components_cost += component_adquisition * replenishment_batch
+            if batch:
+                good_quality_components_buffer.put_many(batch)
 
                 # Log del proceso de reposición
             #log_debug(f"[DEBUG] Time {env.now}: Replenished {replenishment_batch[component]} units of '{component}' to good_quality_components_buffer. Current level: {current_count}.")
        # yield env.timeout(params['interval']*10)  # Revisar los niveles a intervalos definidos
 
 
-def plot_results(monitoring_data):
-    times = monitoring_data['time']
-    
-    #Cores Buffers
-    arrival_levels = monitoring_data['arrival_buffer_level']
-    cleaned_levels = monitoring_data['cleaned_buffer_level']
-    discarded_cores_levels = monitoring_data['discarded_cores_buffer_level']
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.plot(times, arrival_levels, label='Arrival Cores Buffer Level')
-    plt.plot(times, cleaned_levels, label='Cleaned Cores Buffer Level')
-    plt.plot(times, discarded_cores_levels, label='Discarded Cores Buffer Level')
-    plt.xlabel('Time')
-    plt.ylabel('Buffer Level')
-    plt.title('Cores Buffer Levels Over Time')
-    plt.legend()
-    plt.grid(True)
-    st.pyplot(fig)
-    
-    #Component Buffers
-    components_levels = monitoring_data['components_buffer_level']
-    cleaned_components_levels = monitoring_data['cleaned_components_buffer_level']
-    good_quality_components_buffer_levels = monitoring_data['good_quality_components_buffer_level']
-    to_be_repaired_components_buffer_levels = monitoring_data['to_be_repaired_components_buffer_level']
-    discarded_components_buffer_levels = monitoring_data['discarded_components_buffer_level']
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.plot(times, components_levels, label='Components Buffer Level')
-    plt.plot(times, cleaned_components_levels, label='Cleaned Components Buffer Level')
-    plt.plot(times, good_quality_components_buffer_levels, label='Good quality components Buffer Level')
-    plt.plot(times, to_be_repaired_components_buffer_levels, label='To be repaired components Buffer Level')
-    plt.plot(times, discarded_components_buffer_levels, label='Discarded components Buffer Level')
-    plt.xlabel('Time')
-    plt.ylabel('Buffer Level')
-    plt.title('Buffer Levels Over Time')
-    plt.legend()
-    plt.grid(True)
-    st.pyplot(fig)
-
-    #Final product Buffer
-    finished_products_levels = monitoring_data['finished_products_buffer_level']
-    inspected_finished_products_levels = monitoring_data['inspected_finished_products_buffer_level']
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.plot(times, finished_products_levels, label='Finished products Level')
-    plt.plot(times, inspected_finished_products_levels, label='Inspected finished products Level')
-    plt.xlabel('Time')
-    plt.ylabel('Buffer Level')
-    plt.title('Buffer Levels Over Time')
-    plt.legend()
-    plt.grid(True)
-    st.pyplot(fig)
-
-    #Service level plots
-    fulfilled = monitoring_data['fulfilled_requests']
-    delayed = monitoring_data['delayed_requests']
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.plot(times, fulfilled, label='Fulfilled Requests', color='green')
-    plt.plot(times, delayed, label='Delayed Requests', color='red')
-    plt.xlabel('Time')
-    plt.ylabel('Requests')
-    plt.title('Fulfilled vs Delayed Requests Over Time')
-    plt.legend()
-    plt.grid(True)
-    st.pyplot(fig)
-
-
-def plot_stacked_chart(monitoring_data):
-    times = monitoring_data['time']
-    component_a_levels = monitoring_data.get('good_quality_component_a_buffer_level', [])
-    component_b_levels = monitoring_data.get('good_quality_component_b_buffer_level', [])
-    component_c_levels = monitoring_data.get('good_quality_component_c_buffer_level', [])
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.stackplot(times, component_a_levels, component_b_levels, component_c_levels, labels=["Component A", "Component B", "Component C"])
-    plt.xlabel('Time')
-    plt.ylabel('Buffer Level')
-    plt.title('Good Quality Components Buffer Levels (Stacked)')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    st.pyplot(fig)
-
-def plot_discarded_components_stacked_chart(monitoring_data):
-    times = monitoring_data['time']
-    component_a_levels = monitoring_data.get('discarded_component_a_buffer_level', [])
-    component_b_levels = monitoring_data.get('discarded_component_b_buffer_level', [])
-    component_c_levels = monitoring_data.get('discarded_component_c_buffer_level', [])
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.stackplot(times, component_a_levels, component_b_levels, component_c_levels, labels=["Component A", "Component B", "Component C"])
-    plt.xlabel('Time')
-    plt.ylabel('Buffer Level')
-    plt.title('Discarded Components Buffer Levels (Stacked)')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    st.pyplot(fig)
-
-@st.cache_data
-def run_simulation(simulation_time, process_parameters, generate_plots = False):
-    #print("Contenido de process_parameters:", process_parameters.keys())
-    # Validar que process_parameters contiene todas las claves necesarias
-    required_keys = ['cleaning_and_inspection', 'disassembly', 'component_cleaning', 
-                     'component_inspection', 'component_repair', 'assembly', 
-                     'finished_product_inspection']
-    missing_keys = [key for key in required_keys if key not in process_parameters]
-    if missing_keys:
-        raise KeyError(f"Faltan las siguientes claves en process_parameters: {missing_keys}")
-
-
-    # Depuración: imprime los parámetros recibidos
-   # print("Parametros recibidos en run_simulation:", process_parameters)
+# Plotting adapters: plots.py (matplotlib + Streamlit) is only imported on first use
+PLOT_FUNCTIONS = ['plot_series', 'plot_stacked_series', 'plot_results', 'plot_stacked_chart',
+                  'plot_discarded_components_stacked_chart']
 
-    
-    # Crear el entorno de SimPy
-    env = simpy.Environment()
-    
-    # Crear los buffers
-    arrival_buffer = simpy.Store(env, capacity=process_parameters.get('arrival_buffer_capacity', 500))
-    cleaned_buffer = simpy.Store(env, capacity=process_parameters.get('cleaned_buffer_capacity', 500))
-    discarded_cores_buffer = simpy.Store(env, capacity=process_parameters.get('discarded_cores_buffer_capacity', 500))
-    components_buffer = simpy.Store(env, capacity=process_parameters.get('components_buffer_capacity', 500))
-    cleaned_components_buffer = simpy.Store(env, capacity=process_parameters.get('cleaned_components_buffer_capacity', 500))
-    good_quality_components_buffer = simpy.Store(env, capacity=process_parameters.get('good_quality_components_buffer_capacity', 500))
-    to_be_repaired_components_buffer = simpy.Store(env, capacity=process_parameters.get('to_be_repaired_components_buffer_capacity', 500))
-    discarded_components_buffer = simpy.Store(env, capacity=process_parameters.get('discarded_components_buffer_capacity', 500))
-    finished_products_buffer = simpy.Store(env, capacity=process_parameters.get('finished_products_buffer_capacity', 500))
-    inspected_finished_products_buffer = simpy.Store(env, capacity=process_parameters.get('inspected_finished_products_buffer_capacity', 500))
-    discarded_products_buffer = simpy.Store(env, capacity=process_parameters.get('discarded_products_buffer_capacity', 500))
-   
-    # Initialize monitoring data
-    monitoring_data = {
-        'time': [],
-        'arrival_buffer_level': [],
-        'cleaned_buffer_level': [],
-        'discarded_cores_buffer_level': [],
-        'components_buffer_level': [],
-        'cleaned_components_buffer_level': [],
-        'good_quality_components_buffer_level': [],
-        'to_be_repaired_components_buffer_level': [],
-        'discarded_components_buffer_level': [],
-        'finished_products_buffer_level':[],
-        'inspected_finished_products_buffer_level':[],
-        'discarded_products_buffer_level': [],    
-        'fulfilled_requests': [],
-        'delayed_requests': []
-    }
 
-    # Crear los recursos
-    cleaning_inspection_resource = simpy.Resource(env, capacity=process_parameters['cleaning_and_inspection']['capacity'])
-    disassembly_resource = simpy.Resource(env, capacity=process_parameters['disassembly']['capacity'])
-    component_cleaning_resource = simpy.Resource(env, capacity=process_parameters['component_cleaning']['capacity'])
-    component_inspection_resource = simpy.Resource(env, capacity=process_parameters['component_inspection']['capacity'])
-    component_repair_resources = [
-        simpy.Resource(env, capacity=1) for _ in range(process_parameters['component_repair']['capacity'])
-    ]
-    assembly_resource = simpy.Resource(env, capacity=process_parameters['assembly']['capacity'])
-    finished_product_inspection_resource = simpy.Resource(env, capacity=process_parameters['finished_product_inspection']['capacity'])
-
-    # Iniciar procesos
-    env.process(demand_arrival(env, inspected_finished_products_buffer))
-    env.process(cores_arrival(env, arrival_buffer))
-    env.process(cleaning_and_inspection(env, arrival_buffer, cleaned_buffer, discarded_cores_buffer, cleaning_inspection_resource))
-    env.process(disassembly(env, cleaned_buffer, components_buffer, disassembly_resource))
-    env.process(component_cleaning(env, components_buffer, cleaned_components_buffer, component_cleaning_resource))
-    env.process(component_inspection(env, cleaned_components_buffer,
-                                     good_quality_components_buffer,
-                                     to_be_repaired_components_buffer,
-                                     discarded_components_buffer,
-                                     component_inspection_resource))
-
-    # Proceso de reparación con múltiples recursos
-    for resource_id, repair_resource in enumerate(component_repair_resources):
-        env.process(component_repair(env, to_be_repaired_components_buffer,
-                                     good_quality_components_buffer,
-                                     discarded_components_buffer,
-                                     repair_resource,
-                                     resource_id))
-
-    env.process(assembly(env, good_quality_components_buffer, finished_products_buffer, assembly_resource))
-    env.process(finished_product_inspection(env, finished_products_buffer, inspected_finished_products_buffer,
-                                            discarded_products_buffer, finished_product_inspection_resource))
-    env.process(periodic_monitoring(
-        env, arrival_buffer, cleaned_buffer, discarded_cores_buffer, 
-        components_buffer, cleaned_components_buffer, 
-        good_quality_components_buffer, to_be_repaired_components_buffer, 
-        discarded_components_buffer, finished_products_buffer, 
-        inspected_finished_products_buffer, discarded_products_buffer, 
-        monitoring_data
-    ))
+def __getattr__(name):
+    if name in PLOT_FUNCTIONS:
+        import plots
+        return getattr(plots, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    # Ejecutar la simulación
-    env.run(until=simulation_time)
 
-    # Calcular resultados
-    mean_delay_time = cumulative_delay_time / delayed_requests if delayed_requests > 0 else 0
-    mean_lead_time = simulation_time / total_requests if total_requests > 0 else 0
+def kpis(counters, duration):
+    """KPIs of the STATISTICS_COUNTERS accrued over `duration` minutes."""
+    total_requests = counters['total_requests']
+    delayed_requests = counters['delayed_requests']
+    mean_delay_time = counters['cumulative_delay_time'] / delayed_requests if delayed_requests > 0 else 0
+    mean_lead_time = duration / total_requests if total_requests > 0 else 0
     total_cost = (
         delayed_requests * cost_per_delay +
-        cumulative_work_hours * operational_cost_per_hour +
-        core_adquisition_cost
+        counters['cumulative_work_hours'] * operational_cost_per_hour +
+        counters['core_adquisition_cost']
     )
-
-    # Generar gráficos y resúmenes si es necesario
-    #if generate_plots:
-    #    plot_results(monitoring_data)
-    #    if include_stacked_chart_diagram_for_good_quality_components == 'yes':
-    #        plot_stacked_chart(monitoring_data)
-    #        plot_discarded_components_stacked_chart(monitoring_data)
-
-    # Preparar resúmenes de buffers
-    #print("Contents of buffer_log before creating buffer_df:", buffer_log[:5])  # Debugging
-
-    #if not buffer_log:
-        #print("buffer_log is empty. Skipping DataFrame creation.")
-    #else:
-       # buffer_df = pd.DataFrame(buffer_log)
-        #print(buffer_df.head())  # Print the head of the DataFrame if it exists
-
-
-    buffer_df = pd.DataFrame(buffer_log)
-    buffer_summary_by_type = buffer_df.groupby(['buffer', 'type']).agg(
-        mean_count=('count', 'mean'),
-        min_count=('count', 'min'),
-        max_count=('count', 'max')
-    ).reset_index()
-    buffer_summary_total = buffer_df[buffer_df['type'] == 'All'].groupby(['buffer']).agg(
-        mean_count=('count', 'mean'),
-        min_count=('count', 'min'),
-        max_count=('count', 'max')
-    ).reset_index()
-
-    results = {
+    return {
         "Total Requests": total_requests,
-        "Fulfilled Requests": fulfilled_requests,
+        "Fulfilled Requests": counters['fulfilled_requests'],
         "Delayed Requests": delayed_requests,
         "Mean Delay Time": mean_delay_time,
         "Mean Lead Time": mean_lead_time,
         "Total Cost": total_cost,
-        "Total Income": income
+        "Total Income": counters['income']
     }
 
+
+class SimulationRun:
+    # State of one replication: SimPy environment, buffers, resources, flags,
+    # random numbers and KPIs. Nothing here is shared with other runs, so
+    # several runs can live in the same interpreter (or thread) at once.
+    #
+    # Once started, a run cannot be copied or pickled: its processes are
+    # suspended SimPy generators. checkpoint.py therefore does not save a
+    # run's state: it rebuilds the run by replaying it from its configuration
+    # and seed (the model is deterministic). warm_start.py duplicates a run
+    # by forking the process that holds it.
+
+    def __init__(self, simulation_time, process_parameters, seed=SEED, record_horizon=None):
+        # record_horizon: time span the monitoring arrays are sized for (a
+        # streaming run drains them every slice), simulation_time by default
+        self.simulation_time = simulation_time
+        self.params = params = effective_parameters(process_parameters)
+        self.tables = compile_parameters(params)  # Valida los parámetros antes de crear nada
+        self.seed = seed
+        self.events_processed = 0  # Only counted by advance()
+        self.replaying = False  # True while checkpoint.py replays a saved prefix: nothing is recorded
+
+        # Flags: values passed in process_parameters override the module defaults
+        self.warmup_period = params['warmup_period']
+        self.monitoring_interval = params['monitoring_interval']
+        self.include_stacked_chart_diagram_for_good_quality_components = params['include_stacked_chart_diagram_for_good_quality_components']
+        self.replenish_buffers = params['replenish_buffers']
+        self.include_arrival_variability = params['include_arrival_variability']
+        self.include_demand_variability = params['include_demand_variability']
+        self.discard_at_cleaning_and_inspection = params['discard_at_cleaning_and_inspection']
+        self.event_driven_stations = params['event_driven_stations']
+        self.track_buffer_changes = params['track_buffer_changes']
+        self.keep_buffer_log = params['keep_buffer_log']
+        self.random_numbers_kind = params['random_numbers']
+        self.antithetic = params['antithetic']
+        self.keep_discard_times = params['keep_discard_times']
+        self.detect_warmup = params['detect_warmup']
+
+        self.random_numbers = make_random_numbers(self.random_numbers_kind, seed, self.antithetic == 'yes')
+
+        # Serial numbers of the entities (keys of the common random numbers)
+        self.demand_count = 0
+        self.arrival_count = 0
+        self.core_count = 0
+        self.product_count = 0
+
+        # KPIs
+        self.total_requests = 0
+        self.fulfilled_requests = 0
+        self.delayed_requests = 0
+        self.cumulative_delay_time = 0
+        self.cumulative_work_hours = 0
+        self.core_adquisition_cost = 0
+        self.income = 0
+        self.last_request_time = 0
+        self.buyed_components_cost = 0
+        self.backorders = deque()  # Late orders waiting for stock, oldest first: (arrival time, quantity)
+        self.backorder_arrival = None  # Event the backorder process waits on while the queue is empty
+
+        # Statistics window: KPIs and summaries cover [statistics_start, now]
+        self.statistics_start = 0
+        self.statistics_baseline = {name: 0 for name in STATISTICS_COUNTERS}
+        self.statistics_marks = []  # Candidate ends of the warmup: (time, counters)
+        self.warmup_end = None  # Detected end of the warmup (detect_warmup)
+        # Delay time of orders placed before statistics_start but shipped
+        # after it, excluded from Mean Delay Time: (shipping time, delay)
+        self.carried_delays = []
+        self.carried_delay_time = 0
+        self.shipment_log = []  # Late shipments while the warmup end is unknown
+        self.warmup_detector = None
+        if self.detect_warmup == 'yes':
+            self.warmup_detector = WarmupDetector(len(warmup_detection_buffers), min_samples=warmup_min_samples(self))
+
+        # Crear el entorno de SimPy y los buffers
+        self.env = simpy.Environment()
+        self.buffers = {}
+        for buffer_name in buffer_capacities:
+            if buffer_name in sink_buffers:
+                type_of = operator.attrgetter('type') if buffer_name in component_buffers else None
+                self.buffers[buffer_name] = CountingSink(self.env, type_of, keep_times=self.keep_discard_times == 'yes')
+            else:
+                store_class = TypedStore if buffer_name in component_buffers else WaitableStore
+                self.buffers[buffer_name] = store_class(self.env, capacity=params[f'{buffer_name}_capacity'])
+
+        # Monitoring data
+        self.recorder = MonitoringRecorder(monitoring_columns(self), record_horizon or simulation_time, self.monitoring_interval,
+                                           dtypes={'fulfilled_requests': np.int64, 'delayed_requests': np.int64})
+        self.buffer_statistics = BufferStatistics(start_time=self.env.now)
+        self.buffer_log = []  # Raw buffer samples, only filled when keep_buffer_log == 'yes'
+        self.request_traces = None
+        if self.track_buffer_changes == 'yes':
+            # Seguimiento por cambios: cada buffer registra su nivel solo cuando cambia
+            for buffer in self.buffers.values():
+                buffer.track_levels()
+            self.request_traces = {
+                'fulfilled_requests': LevelTrace(self.env.now, 0),
+                'delayed_requests': LevelTrace(self.env.now, 0)
+            }
+
+    def start(self):
+        env = self.env
+        capacity = self.tables.capacity
+        buffers = self.buffers
+
+        # Crear los recursos
+        cleaning_inspection_resource = simpy.Resource(env, capacity=capacity['cleaning_and_inspection'])
+        disassembly_resource = simpy.Resource(env, capacity=capacity['disassembly'])
+        component_cleaning_resource = simpy.Resource(env, capacity=capacity['component_cleaning'])
+        component_inspection_resource = simpy.Resource(env, capacity=capacity['component_inspection'])
+        component_repair_resources = [
+            simpy.Resource(env, capacity=1) for _ in range(capacity['component_repair'])
+        ]
+        assembly_resource = simpy.Resource(env, capacity=capacity['assembly'])
+        finished_product_inspection_resource = simpy.Resource(env, capacity=capacity['finished_product_inspection'])
+
+        # Iniciar procesos
+        env.process(demand_arrival(self, buffers['inspected_finished_products_buffer']))
+        env.process(fill_backorders(self, buffers['inspected_finished_products_buffer']))
+        env.process(cores_arrival(self, buffers['arrival_buffer']))
+        env.process(cleaning_and_inspection(self, buffers['arrival_buffer'], buffers['cleaned_buffer'],
+                                            buffers['discarded_cores_buffer'], cleaning_inspection_resource))
+        env.process(disassembly(self, buffers['cleaned_buffer'], buffers['components_buffer'], disassembly_resource))
+        env.process(component_cleaning(self, buffers['components_buffer'], buffers['cleaned_components_buffer'],
+                                       component_cleaning_resource))
+        env.process(component_inspection(self, buffers['cleaned_components_buffer'],
+                                         buffers['good_quality_components_buffer'],
+                                         buffers['to_be_repaired_components_buffer'],
+                                         buffers['discarded_components_buffer'],
+                                         component_inspection_resource))
+
+        # Proceso de reparación con múltiples recursos
+        for resource_id, repair_resource in enumerate(component_repair_resources):
+            env.process(component_repair(self, buffers['to_be_repaired_components_buffer'],
+                                         buffers['good_quality_components_buffer'],
+                                         buffers['discarded_components_buffer'],
+                                         repair_resource,
+                                         resource_id))
+
+        env.process(assembly(self, buffers['good_quality_components_buffer'], buffers['finished_products_buffer'],
+                             assembly_resource))
+        env.process(finished_product_inspection(self, buffers['finished_products_buffer'],
+                                                buffers['inspected_finished_products_buffer'],
+                                                buffers['discarded_products_buffer'],
+                                                finished_product_inspection_resource))
+        if self.track_buffer_changes != 'yes':
+            env.process(periodic_monitoring(self))
+        if self.detect_warmup == 'yes':
+            env.process(warmup_detection(self))
+
+    def advance(self, until):
+        """Run the model up to `until` (at most simulation_time) and return
+        the number of events processed. Runs advanced in several steps give
+        the same results as a single env.run()."""
+        env = self.env
+        until = min(until, self.simulation_time)
+        events = 0
+        while env.peek() < until:
+            env.step()
+            events += 1
+        if until > env.now:
+            env.run(until=until)
+        self.events_processed += events
+        return events
+
+    def extend(self, simulation_time):
+        """Raise the horizon of the run (finished or not); the next advance()
+        continues from the current state instead of starting over."""
+        if simulation_time < self.env.now:
+            raise ValueError(f"Cannot extend the run to {simulation_time}: it is already at {self.env.now}")
+        self.simulation_time = simulation_time
+
+    def counters(self):
+        """Current values of STATISTICS_COUNTERS (from the start of the run)."""
+        return {name: getattr(self, name) for name in STATISTICS_COUNTERS}
+
+    def carried_delay(self, time):
+        """Part of carried_delay_time shipped before `time`."""
+        return sum(delay for shipped, delay in self.carried_delays if shipped < time)
+
+    def results(self):
+        # Counters accrued since statistics_start (the start of the run unless a warmup was detected)
+        counters = {name: value - self.statistics_baseline[name] for name, value in self.counters().items()}
+        counters['cumulative_delay_time'] -= self.carried_delay_time
+        results = kpis(counters, self.env.now - self.statistics_start)
+        if self.detect_warmup == 'yes':
+            # NaN: no steady state found yet (the run is too short or the plant keeps drifting)
+            results["Warmup End"] = float('nan') if self.warmup_end is None else self.warmup_end
+        return results
+
+    def monitoring_data(self):
+        if self.track_buffer_changes == 'yes':
+            return traced_monitoring_data(self, self.env.now)
+        return self.recorder.data()
+
+    def buffer_summaries(self):
+        import pandas as pd  # Only needed for the summary tables
+
+        # Resúmenes de buffers (medias ponderadas en el tiempo)
+        if self.track_buffer_changes == 'yes':
+            rows = traced_buffer_summary(self, self.env.now)
+        else:
+            rows = self.buffer_statistics.summary(self.env.now)
+        buffer_summary_by_type = pd.DataFrame(rows, columns=['buffer', 'type', 'mean_count', 'min_count', 'max_count'])
+        buffer_summary_total = buffer_summary_by_type[buffer_summary_by_type['type'] == 'All'].drop(columns='type').reset_index(drop=True)
+        return buffer_summary_by_type, buffer_summary_total
+
+
+def simulate(simulation_time, process_parameters, seed=SEED):
+    """Run one replication to the end and return its SimulationRun."""
+    run = SimulationRun(simulation_time, process_parameters, seed)
+    run.start()
+
+    # Ejecutar la simulación
+    run.env.run(until=simulation_time)
+    return run
+
+
+def simulation_output(run):
+    """Output dict of run_simulation for a (finished) SimulationRun."""
+    buffer_summary_by_type, buffer_summary_total = run.buffer_summaries()
     return {
-        "results": results,  # Aquí se deben almacenar los resultados principales
-        "include_stacked_chart": include_stacked_chart_diagram_for_good_quality_components,
-        "monitoring_data": monitoring_data,
-        #"Total Requests": total_requests,
-        #"Fulfilled Requests": fulfilled_requests,
-        #"Delayed Requests": delayed_requests,
-        #"Mean Delay Time": mean_delay_time,
-        #"Mean Lead Time": mean_lead_time,
-        #"Total Cost": total_cost,
-        #"Total Income": income,
+        "results": run.results(),  # Aquí se deben almacenar los resultados principales
+        "include_stacked_chart": run.include_stacked_chart_diagram_for_good_quality_components,
+        "monitoring_data": run.monitoring_data(),
         "Buffer Summary By Type": buffer_summary_by_type,
         "Buffer Summary Total": buffer_summary_total
     }
 
+
+# KPIs that add up over time (the increments of a slice are meaningful)
+ADDITIVE_KPIS = ['Total Requests', 'Fulfilled Requests', 'Delayed Requests', 'Total Cost', 'Total Income']
+
+
+def stream_simulation(simulation_time, process_parameters, slice_time=1440, seed=SEED):
+    """Run the model in slices of `slice_time` simulated minutes and yield a
+    snapshot after each one:
+
+        {'time', 'results', 'increments', 'monitoring_data'}
+
+    results are the KPIs so far, increments the change of ADDITIVE_KPIS over
+    the slice and monitoring_data only the samples recorded in the slice
+    (level changes with track_buffer_changes). The last snapshot also has
+    the 'Buffer Summary By Type' and 'Buffer Summary Total' tables. Memory
+    is bounded by the slice, not by the horizon, as long as the consumer
+    does not keep the snapshots."""
+    if slice_time <= 0:
+        raise ValueError(f"slice_time must be > 0, got {slice_time}")
+    if effective_parameters(process_parameters)['detect_warmup'] == 'yes':
+        raise ValueError("detect_warmup trims the history of the run, which a streamed run has already handed out")
+    run = SimulationRun(simulation_time, process_parameters, seed, record_horizon=slice_time)
+    run.start()
+    previous = run.results()
+    while run.env.now < simulation_time:
+        run.advance(run.env.now + slice_time)
+        results = run.results()
+        snapshot = {
+            'time': run.env.now,
+            'results': results,
+            'increments': {kpi: results[kpi] - previous[kpi] for kpi in ADDITIVE_KPIS},
+            'monitoring_data': drain_monitoring_data(run)
+        }
+        if run.env.now >= simulation_time:
+            snapshot["Buffer Summary By Type"], snapshot["Buffer Summary Total"] = run.buffer_summaries()
+        previous = results
+        yield snapshot
+
+
+def run_simulation(simulation_time, process_parameters, generate_plots = False, seed=SEED, use_cache=True):
+    # Resultados en la caché de disco compartida (ver cache.py)
+    cache = ResultCache() if use_cache else None
+    if cache is not None:
+        key = cache_key(simulation_time, effective_parameters(process_parameters), seed)
+        output = cache.load(key)
+        if output is not None:
+            return output
+
+    output = simulation_output(simulate(simulation_time, process_parameters, seed))
+    if cache is not None:
+        cache.store(key, output)
+    return output
+
 #if __name__ == "__main__":
 #    print("Validando run_simulation...")
 
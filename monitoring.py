@@ -0,0 +1,300 @@
+import math
+from array import array
+
+import numpy as np
+
+
+# Time series recorder for periodic_monitoring.
+#
+# All columns are preallocated NumPy arrays sized from the horizon and the
+# monitoring interval, so recording a sample is a handful of array stores
+# and the finished series can be handed out as views without copying.
+class MonitoringRecorder:
+
+    def __init__(self, columns, simulation_time, monitoring_interval, dtypes=None):
+        if monitoring_interval <= 0:
+            raise ValueError(f"monitoring_interval must be > 0, got {monitoring_interval}")
+        dtypes = dtypes or {}
+        self.size = max(1, math.ceil(simulation_time / monitoring_interval))
+        self.length = 0
+        self.names = list(columns)
+        self.time = np.empty(self.size, dtype=np.float64)
+        self.columns = [np.empty(self.size, dtype=dtypes.get(name, np.int32)) for name in self.names]
+
+    def record(self, time, *values):
+        i = self.length
+        if i == self.size:
+            self._grow()
+        self.time[i] = time
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        self.length = i + 1
+
+    def data(self):
+        """Recorded series as {name: array view}, including 'time'."""
+        n = self.length
+        data = {'time': self.time[:n]}
+        for name, column in zip(self.names, self.columns):
+            data[name] = column[:n]
+        return data
+
+    def drain(self):
+        """Copy of the samples recorded since the previous drain; the
+        recorder then starts over in the same arrays."""
+        data = {name: values.copy() for name, values in self.data().items()}
+        self.length = 0
+        return data
+
+    def _grow(self):
+        # Only reached if the run goes past the horizon it was sized for
+        self.size *= 2
+        self.time = np.resize(self.time, self.size)
+        self.columns = [np.resize(column, self.size) for column in self.columns]
+
+
+# Running mean/min/max of every buffer level, updated in place.
+#
+# Levels are treated as step functions: a level observed at time t holds
+# until the next observation, so the mean is time-weighted. Memory is one
+# small accumulator per (buffer, type) pair regardless of the run length.
+# mark() remembers the accumulators at candidate starts of the steady state
+# so that rebase() can later restrict the statistics to the time after one.
+class BufferStatistics:
+
+    def __init__(self, start_time=0):
+        self.start_time = start_time
+        self._accumulators = {}  # (buffer, type) -> [last time, last level, integral, min, max]
+        self._marks = []  # (time, {(buffer, type): (integral up to time, min, max of the segment before time)})
+
+    def update(self, buffer_name, item_type, time, level):
+        accumulator = self._accumulators.get((buffer_name, item_type))
+        if accumulator is None:
+            # A type seen for the first time was at level 0 until now
+            minimum = level if time <= self.start_time else min(level, 0)
+            self._accumulators[(buffer_name, item_type)] = [time, level, 0.0, minimum, level]
+            return
+        accumulator[2] += accumulator[1] * (time - accumulator[0])
+        accumulator[0] = time
+        accumulator[1] = level
+        if level < accumulator[3]:
+            accumulator[3] = level
+        elif level > accumulator[4]:
+            accumulator[4] = level
+
+    def mark(self, time):
+        """Remember the statistics at `time`; minimum and maximum start a
+        new segment there."""
+        snapshot = {}
+        for key, accumulator in self._accumulators.items():
+            last_time, last_level, integral, minimum, maximum = accumulator
+            snapshot[key] = (integral + last_level * (time - last_time), minimum, maximum)
+            accumulator[3] = accumulator[4] = last_level
+        self._marks.append((time, snapshot))
+
+    def rebase(self, time):
+        """Restrict the statistics to the time since the mark at `time` and
+        forget the marks."""
+        base = dict(self._marks)[time]
+        later = [snapshot for mark_time, snapshot in self._marks if mark_time > time]
+        for key, accumulator in self._accumulators.items():
+            if key in base:
+                accumulator[2] -= base[key][0]
+            for snapshot in later:
+                if key in snapshot:
+                    accumulator[3] = min(accumulator[3], snapshot[key][1])
+                    accumulator[4] = max(accumulator[4], snapshot[key][2])
+        self.start_time = time
+        self._marks = []
+
+    def summary(self, end_time):
+        """Rows {'buffer', 'type', 'mean_count', 'min_count', 'max_count'}
+        sorted by buffer and type."""
+        duration = end_time - self.start_time
+        rows = []
+        for key, (last_time, last_level, integral, minimum, maximum) in sorted(self._accumulators.items()):
+            buffer_name, item_type = key
+            integral += last_level * (end_time - last_time)
+            for mark_time, snapshot in self._marks:
+                if key in snapshot:
+                    minimum = min(minimum, snapshot[key][1])
+                    maximum = max(maximum, snapshot[key][2])
+            rows.append({
+                'buffer': buffer_name,
+                'type': item_type,
+                'mean_count': integral / duration if duration > 0 else last_level,
+                'min_count': minimum,
+                'max_count': maximum
+            })
+        return rows
+
+
+# Step-function history of one level, recorded only when it changes.
+#
+# Times and levels are kept in compact typed arrays. Several changes at the
+# same instant collapse into the last one, so every stored step has a
+# positive duration; minimum and maximum still see the momentary levels.
+# drain() hands out and forgets the steps recorded so far (for streaming
+# runs); their area is kept, so summary() still covers the whole history.
+# mark() does the same without handing them out, so a run looking for the
+# end of its warmup keeps no history until it is found.
+class LevelTrace:
+
+    def __init__(self, time=0, level=0):
+        self.start = time
+        self.times = array('d', [time])
+        self.levels = array('q', [level])
+        self.minimum = level
+        self.maximum = level
+        self._integral = 0.0  # Area under the steps already drained
+        self._drained = False  # The first stored step was already handed out
+        self._marks = []  # (time, area up to time, min, max of the segment before time), see BufferStatistics.mark
+
+    def record(self, time, level):
+        if level == self.levels[-1]:
+            return
+        if level < self.minimum:
+            self.minimum = level
+        elif level > self.maximum:
+            self.maximum = level
+        if time == self.times[-1]:
+            self.levels[-1] = level
+            if len(self.levels) > 1 and self.levels[-2] == level:
+                self.times.pop()
+                self.levels.pop()
+            return
+        self.times.append(time)
+        self.levels.append(level)
+
+    def zeros(self):
+        """Trace of a level that was 0 until now, covering the same time."""
+        trace = LevelTrace(self.times[0], 0)
+        trace.start = self.start
+        return trace
+
+    def arrays(self, end_time):
+        """(times, levels) NumPy arrays, closed with a point at end_time."""
+        times = np.frombuffer(self.times, dtype=np.float64)
+        levels = np.frombuffer(self.levels, dtype=np.int64)
+        if end_time > times[-1]:
+            times = np.append(times, end_time)
+            levels = np.append(levels, levels[-1])
+        return times, levels
+
+    def drain(self):
+        """(times, levels) of the steps recorded since the previous drain,
+        as NumPy copies. Only the current step is kept."""
+        times = np.array(self.times, dtype=np.float64)
+        levels = np.array(self.levels, dtype=np.int64)
+        self._integral += float(np.dot(levels[:-1], np.diff(times)))
+        del self.times[:-1]
+        del self.levels[:-1]
+        first = 1 if self._drained else 0
+        self._drained = True
+        return times[first:], levels[first:]
+
+    def mark(self, time):
+        """Remember the area up to `time` and forget the steps before it;
+        minimum and maximum start a new segment there."""
+        times = np.frombuffer(self.times, dtype=np.float64)
+        levels = np.frombuffer(self.levels, dtype=np.int64)
+        self._integral += float(np.dot(levels, np.diff(times, append=time)))
+        level = self.levels[-1]
+        self.times = array('d', [time])
+        self.levels = array('q', [level])
+        self._marks.append((time, self._integral, self.minimum, self.maximum))
+        self.minimum = self.maximum = level
+
+    def rebase(self, time):
+        """Restrict the statistics to the time since the mark at `time` (none
+        if the level was created later) and forget the marks."""
+        for mark_time, integral, minimum, maximum in self._marks:
+            if mark_time == time:
+                self._integral -= integral
+            elif mark_time > time:
+                self.minimum = min(self.minimum, minimum)
+                self.maximum = max(self.maximum, maximum)
+        self.start = time
+        self._marks = []
+
+    def summary(self, end_time):
+        times = np.frombuffer(self.times, dtype=np.float64)
+        levels = np.frombuffer(self.levels, dtype=np.int64)
+        durations = np.diff(times, append=end_time)
+        duration = end_time - self.start
+        integral = self._integral + float(np.dot(levels, durations))
+        return {
+            'mean_count': integral / duration if duration > 0 else float(levels[-1]),
+            'min_count': min([self.minimum] + [minimum for _, _, minimum, _ in self._marks]),
+            'max_count': max([self.maximum] + [maximum for _, _, _, maximum in self._marks])
+        }
+
+
+# Online MSER-5 detection of the end of the warmup.
+#
+# One sample of several series arrives at a time; samples are averaged in
+# batches of batch_size and, every check_batches batches, MSER looks for the
+# truncation point of every series. The warmup ends at the latest of them,
+# once all of them are in the first half of the data seen so far (and at
+# least min_samples samples were seen).
+class WarmupDetector:
+
+    def __init__(self, series, batch_size=5, check_batches=20, min_samples=0):
+        self.batch_size = batch_size
+        self.check_batches = check_batches
+        self.require(min_samples)
+        self.count = 0  # Complete batches
+        self.means = np.empty((check_batches * 8, series))
+        self._sums = np.zeros(series)
+        self._samples = 0
+
+    def require(self, min_samples):
+        """Trust MSER only once `min_samples` samples were seen."""
+        self.min_batches = math.ceil(min_samples / self.batch_size)
+
+    def add(self, values):
+        """Add one sample of every series; True when a check point is reached."""
+        self._sums += values
+        self._samples += 1
+        if self._samples < self.batch_size:
+            return False
+        if self.count == len(self.means):
+            self.means = np.resize(self.means, (2 * self.count, self.means.shape[1]))
+        self.means[self.count] = self._sums / self.batch_size
+        self.count += 1
+        self._sums[:] = 0
+        self._samples = 0
+        return self.count % self.check_batches == 0
+
+    def truncation(self):
+        """Number of batches to delete, or None if some series has not
+        settled yet."""
+        if self.count < self.min_batches:
+            return None
+        points = [mser_truncation(self.means[:self.count, i]) for i in range(self.means.shape[1])]
+        if None in points:
+            return None
+        return max(points)
+
+
+def mser_truncation(batch_means):
+    """MSER truncation point of a series of batch means: the number d of
+    leading means to delete that minimises the variance of the remaining
+    ones divided by their number. None if the minimum over the first half
+    is at its end (the series is still trending)."""
+    z = np.asarray(batch_means, dtype=np.float64)
+    n = len(z)
+    if n < 4:
+        return None
+    z = z - z.mean()  # Less cancellation in the sums of squares
+    remaining = np.arange(n, 0, -1)
+    suffix_sum = np.cumsum(z[::-1])[::-1]
+    suffix_squares = np.cumsum((z * z)[::-1])[::-1]
+    statistic = np.maximum(suffix_squares - suffix_sum * suffix_sum / remaining, 0) / (remaining * remaining)
+    half = n // 2
+    d = int(np.argmin(statistic[:half + 1]))
+    return d if d < half else None
+
+
+def step_values(times, levels, at):
+    """Values of the step series (times, levels) at the instants `at`."""
+    return levels[np.searchsorted(times, at, side='right') - 1]
@@ -0,0 +1,138 @@
+import numbers
+
+
+# Compiled form of process_parameters.
+#
+# compile_parameters() validates the nested parameter dict once, before the
+# run starts, and turns it into flat tuples indexed by small integer codes:
+# quality levels are 0/1/2 (LOW/MEDIUM/HIGH) and component types are
+# numbered in bill of materials order. Per-component tables are laid out as
+# table[component_code * 3 + quality], thresholds as (low, medium) pairs.
+# Station processes only index these tuples, and a bad value (a missing key,
+# a None left by the sidebar validation, Low above Medium...) is reported
+# with its full path instead of failing deep inside a generator.
+
+QUALITY_LEVELS = ('Low', 'Medium', 'High')
+LOW, MEDIUM, HIGH = 0, 1, 2
+
+
+def _lookup(params, path):
+    value = params
+    for depth, key in enumerate(path):
+        if not isinstance(value, dict):
+            raise ValueError(f"process_parameters.{'.'.join(path[:depth])}: expected a dict, got {value!r}")
+        if key not in value:
+            raise KeyError(f"process_parameters.{'.'.join(path)} is missing")
+        value = value[key]
+    return value
+
+
+def _number(params, *path, minimum=None, integer=False):
+    value = _lookup(params, path)
+    if not isinstance(value, numbers.Real) or isinstance(value, bool):
+        raise ValueError(f"process_parameters.{'.'.join(path)}: expected a number, got {value!r}")
+    if integer and value != int(value):
+        raise ValueError(f"process_parameters.{'.'.join(path)}: expected an integer, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"process_parameters.{'.'.join(path)}: must be >= {minimum}, got {value!r}")
+    return int(value) if integer else value
+
+
+def _thresholds(params, *path):
+    # Cumulative (Low, Medium) thresholds; any 'High' entry is ignored
+    low = _number(params, *path, 'Low')
+    medium = _number(params, *path, 'Medium')
+    if low > medium:
+        raise ValueError(f"process_parameters.{'.'.join(path)}: Low ({low}) must not be above Medium ({medium})")
+    return (low, medium)
+
+
+class CompiledParameters:
+
+    def __init__(self, params):
+        # The buffer log holds the periodic samples, and change tracking takes none
+        if params.get('track_buffer_changes') == 'yes' and params.get('keep_buffer_log') == 'yes':
+            raise ValueError("process_parameters.keep_buffer_log: 'yes' needs track_buffer_changes = 'no' "
+                             "(the level traces already hold every change)")
+        # Tipos de componente, en el orden del BOM
+        bom = _lookup(params, ['bill_of_materials'])
+        if not isinstance(bom, dict) or not bom:
+            raise ValueError(f"process_parameters.bill_of_materials: expected a non-empty dict, got {bom!r}")
+        self.component_types = tuple(bom)
+        self.component_code = {component: code for code, component in enumerate(self.component_types)}
+        self.bom = {component: _number(params, 'bill_of_materials', component, minimum=0, integer=True)
+                    for component in self.component_types}
+        # One code per component taken out of a core, in disassembly order
+        self.bom_items = tuple(code for code, component in enumerate(self.component_types)
+                               for _ in range(self.bom[component]))
+
+        def per_component(function, *path):
+            return tuple(value for component in self.component_types for value in function(*path, component))
+
+        def per_quality(*path):
+            return tuple(_number(params, *path, quality, minimum=0) for quality in QUALITY_LEVELS)
+
+        def per_quality_thresholds(*path):
+            return tuple(_thresholds(params, *path, quality) for quality in QUALITY_LEVELS)
+
+        # Llegadas
+        self.demand_interval = _number(params, 'demand', 'interval', minimum=0)
+        self.demand_variability = _number(params, 'demand', 'variability', minimum=0)
+        self.demand_quantity_min = _number(params, 'demand', 'quantity_min', minimum=0, integer=True)
+        self.demand_quantity_max = _number(params, 'demand', 'quantity_max', minimum=self.demand_quantity_min, integer=True)
+        self.arrival_interval = _number(params, 'cores_arrival', 'interval', minimum=0)
+        self.arrival_variability = _number(params, 'cores_arrival', 'variability', minimum=0)
+        self.arrival_batch_min = _number(params, 'cores_arrival', 'batch_size_min', minimum=0, integer=True)
+        self.arrival_batch_max = _number(params, 'cores_arrival', 'batch_size_max', minimum=self.arrival_batch_min, integer=True)
+
+        # Estaciones
+        self.capacity = {
+            process: _number(params, process, 'capacity', minimum=1, integer=True)
+            for process in ['cleaning_and_inspection', 'disassembly', 'component_cleaning', 'component_inspection',
+                            'component_repair', 'assembly', 'finished_product_inspection']
+        }
+
+        self.cleaning_batch_size = _number(params, 'cleaning_and_inspection', 'batch_size', minimum=1, integer=True)
+        self.cleaning_thresholds = _thresholds(params, 'cleaning_and_inspection', 'quality_thresholds')
+        self.cleaning_times = per_quality('cleaning_and_inspection', 'process_times')
+
+        self.disassembly_batch_size = _number(params, 'disassembly', 'batch_size', minimum=1, integer=True)
+        self.disassembly_times = per_quality('disassembly', 'process_time')
+
+        self.component_cleaning_batch_size = _number(params, 'component_cleaning', 'batch_size', minimum=1, integer=True)
+        self.component_cleaning_thresholds = _thresholds(params, 'component_cleaning', 'quality_thresholds')
+        self.component_cleaning_times = per_component(per_quality, 'component_cleaning', 'process_times')
+
+        self.inspection_batch_size = {
+            component: _number(params, 'component_inspection', 'batch_size', component, minimum=1, integer=True)
+            for component in self.component_types
+        }
+        self.inspection_thresholds = per_component(per_quality_thresholds, 'component_inspection', 'quality_thresholds')
+        self.inspection_times = per_component(per_quality, 'component_inspection', 'process_times')
+
+        self.repair_easiness_thresholds = tuple(
+            _thresholds(params, 'component_repair', 'easiness_to_repair_thresholds', component)
+            for component in self.component_types
+        )
+        self.repair_thresholds = per_component(per_quality_thresholds, 'component_repair', 'quality_thresholds')
+        self.repair_times = per_component(per_quality, 'component_repair', 'process_times')
+        self.max_repair_attempts = _number(params, 'component_repair', 'max_repair_attempts', minimum=1, integer=True)
+
+        self.assembly_time = _number(params, 'assembly', 'process_time', minimum=0)
+
+        self.product_inspection_thresholds = _thresholds(params, 'finished_product_inspection', 'quality_thresholds')
+        self.product_inspection_time = _number(params, 'finished_product_inspection', 'process_time', minimum=0)
+
+        # Reposición: (componente, umbral, lote) en el orden de los umbrales
+        thresholds = _lookup(params, ['replenishment', 'thresholds'])
+        self.replenishment = tuple(
+            (component,
+             _number(params, 'replenishment', 'thresholds', component),
+             _number(params, 'replenishment', 'replenishment_batch', component, minimum=0, integer=True))
+            for component in thresholds
+        )
+        self.replenishment_interval = _number(params, 'replenishment', 'interval', minimum=0)
+
+
+def compile_parameters(params):
+    return CompiledParameters(params)
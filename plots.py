@@ -0,0 +1,150 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+
+from monitoring import step_values
+
+
+# Charts of the monitoring series for the Streamlit app.
+#
+# Kept out of modelo.py so that the simulation engine can be imported (by
+# the command line tools and the worker processes) without loading
+# matplotlib or Streamlit. modelo still exposes these functions, importing
+# this module the first time one of them is used.
+
+
+# Charts are 10 inches wide at 100 dpi: about 1000 pixel columns
+MAX_BUCKETS = 1000
+
+
+def envelope_indices(values, buckets=MAX_BUCKETS):
+    """Indices of the first, last, minimum and maximum point of each of
+    `buckets` equal slices of `values`, in order (min/max envelope)."""
+    n = len(values)
+    if n <= 4 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)  # Points per bucket, rounded up
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size - 1, n - 1)
+    padded = np.concatenate([values, np.full(len(starts) * size - n, values[-1])]).reshape(len(starts), size)
+    lows = starts + padded.argmin(axis=1)
+    highs = starts + padded.argmax(axis=1)
+    return np.unique(np.concatenate([starts, lows, highs, ends]).clip(0, n - 1))
+
+
+def decimate(times, values, buckets=MAX_BUCKETS):
+    """(times, values) reduced to at most 4 points per bucket, keeping every
+    local minimum and maximum visible at chart resolution."""
+    times = np.asarray(times)
+    values = np.asarray(values)
+    keep = envelope_indices(values, buckets)
+    return times[keep], values[keep]
+
+
+def plot_series(monitoring_data, name, **kwargs):
+    values = monitoring_data[name]
+    if isinstance(values, tuple):
+        # Change-triggered step series: (times, levels)
+        times, levels = values
+    else:
+        times, levels = monitoring_data['time'], values
+    # Levels and counters are step functions: they hold until the next change
+    plt.step(*decimate(times, levels), where='post', **kwargs)
+
+
+def plot_stacked_series(monitoring_data, names, labels):
+    series = [monitoring_data.get(name, []) for name in names]
+    if series and all(isinstance(values, tuple) for values in series):
+        # Put the step series on a common time axis before stacking
+        times = np.unique(np.concatenate([values[0] for values in series]))
+        series = [step_values(values[0], values[1], times) for values in series]
+    else:
+        times = np.asarray(monitoring_data['time'])
+        series = [np.asarray(values) for values in series]
+    if series and all(len(values) == len(times) for values in series):
+        # Same instants for every layer: the envelope of each layer and of the total
+        keep = np.unique(np.concatenate([envelope_indices(values) for values in series + [sum(series)]]))
+        times = times[keep]
+        series = [values[keep] for values in series]
+    plt.stackplot(times, *series, labels=labels, step='post')
+
+
+def plot_results(monitoring_data):
+    #Cores Buffers
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_series(monitoring_data, 'arrival_buffer_level', label='Arrival Cores Buffer Level')
+    plot_series(monitoring_data, 'cleaned_buffer_level', label='Cleaned Cores Buffer Level')
+    plot_series(monitoring_data, 'discarded_cores_buffer_level', label='Discarded Cores Buffer Level')
+    plt.xlabel('Time')
+    plt.ylabel('Buffer Level')
+    plt.title('Cores Buffer Levels Over Time')
+    plt.legend()
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
+    
+    #Component Buffers
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_series(monitoring_data, 'components_buffer_level', label='Components Buffer Level')
+    plot_series(monitoring_data, 'cleaned_components_buffer_level', label='Cleaned Components Buffer Level')
+    plot_series(monitoring_data, 'good_quality_components_buffer_level', label='Good quality components Buffer Level')
+    plot_series(monitoring_data, 'to_be_repaired_components_buffer_level', label='To be repaired components Buffer Level')
+    plot_series(monitoring_data, 'discarded_components_buffer_level', label='Discarded components Buffer Level')
+    plt.xlabel('Time')
+    plt.ylabel('Buffer Level')
+    plt.title('Buffer Levels Over Time')
+    plt.legend()
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
+
+    #Final product Buffer
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_series(monitoring_data, 'finished_products_buffer_level', label='Finished products Level')
+    plot_series(monitoring_data, 'inspected_finished_products_buffer_level', label='Inspected finished products Level')
+    plt.xlabel('Time')
+    plt.ylabel('Buffer Level')
+    plt.title('Buffer Levels Over Time')
+    plt.legend()
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
+
+    #Service level plots
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_series(monitoring_data, 'fulfilled_requests', label='Fulfilled Requests', color='green')
+    plot_series(monitoring_data, 'delayed_requests', label='Delayed Requests', color='red')
+    plt.xlabel('Time')
+    plt.ylabel('Requests')
+    plt.title('Fulfilled vs Delayed Requests Over Time')
+    plt.legend()
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def plot_stacked_chart(monitoring_data):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_stacked_series(monitoring_data,
+                        ['good_quality_component_a_buffer_level', 'good_quality_component_b_buffer_level', 'good_quality_component_c_buffer_level'],
+                        labels=["Component A", "Component B", "Component C"])
+    plt.xlabel('Time')
+    plt.ylabel('Buffer Level')
+    plt.title('Good Quality Components Buffer Levels (Stacked)')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
+
+def plot_discarded_components_stacked_chart(monitoring_data):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_stacked_series(monitoring_data,
+                        ['discarded_component_a_buffer_level', 'discarded_component_b_buffer_level', 'discarded_component_c_buffer_level'],
+                        labels=["Component A", "Component B", "Component C"])
+    plt.xlabel('Time')
+    plt.ylabel('Buffer Level')
+    plt.title('Discarded Components Buffer Levels (Stacked)')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)
@@ -0,0 +1,134 @@
+import random
+
+import numpy as np
+
+
+# Random number sources of a run.
+#
+# Every draw names the process that makes it and, optionally, the entity
+# and decision it is for, e.g. ('component_repair', (core, position), 3).
+#
+# ProcessStreams (the default) keeps the original behaviour: one
+# random.Random per process, consumed in event order. BlockStreams
+# ('block') also keeps one stream per process, but draws its uniforms from
+# NumPy in large blocks and hands them out one by one, so a decision costs
+# a list step instead of a random.Random call; it is faster but yields
+# other draws, so every KPI of a seed changes. CommonRandomNumbers derives each draw
+# from a hash of (seed, process, entity, decision) instead, so a given core
+# or component gets the same draws in every scenario no matter in which
+# order the stations reach it (common random numbers). With antithetic=True
+# both sources return the mirrored value of every draw (u -> 1 - u).
+
+SEED = 3
+
+# Number of consecutive integer seeds used by one run (see make_random_generators)
+RANDOM_STREAMS = 7
+
+# Integer code of every process that draws random numbers
+STREAM_CODES = {
+    'cleaning_and_inspection': 0,
+    'component_cleaning': 1,
+    'component_inspection': 2,
+    'component_repair': 3,
+    'finished_product_inspection': 4,
+    'demand_arrival': 5,
+    'cores_arrival': 6,
+}
+
+MASK64 = (1 << 64) - 1
+
+BLOCK_SIZE = 4096  # Uniforms drawn at once by BlockStreams
+
+
+def make_random_generators(seed=SEED):
+    # One independent stream per process, created fresh for every run
+    return {
+        'cleaning_and_inspection': random.Random(seed),
+        'component_cleaning': random.Random(seed + 1),
+        'component_inspection': random.Random(seed + 2),
+        'component_repair': random.Random(seed + 3),
+        'finished_product_inspection': random.Random(seed + 4),
+        'demand_arrival': random.Random(seed + 5),
+        'cores_arrival': random.Random(seed + 6),
+    }
+
+
+class ProcessStreams:
+
+    def __init__(self, seed=SEED, antithetic=False):
+        self.generators = make_random_generators(seed)
+        self.antithetic = antithetic
+
+    def uniform(self, process_name, low, high, entity=(), decision=0):
+        value = self.generators[process_name].uniform(low, high)
+        return low + high - value if self.antithetic else value
+
+    def randint(self, process_name, low, high, entity=(), decision=0):
+        value = self.generators[process_name].randint(low, high)
+        return low + high - value if self.antithetic else value
+
+
+def block_uniforms(generator, block_size, antithetic=False):
+    # Endless stream of Python floats, produced block_size at a time
+    while True:
+        block = generator.random(block_size)
+        if antithetic:
+            block = 1.0 - block
+        yield from block.tolist()
+
+
+class BlockStreams:
+
+    def __init__(self, seed=SEED, antithetic=False, block_size=BLOCK_SIZE):
+        self.antithetic = antithetic
+        # Independent NumPy generator per process, seeded with (seed, process code)
+        self.streams = {name: block_uniforms(np.random.default_rng([seed, code]), block_size, antithetic)
+                        for name, code in STREAM_CODES.items()}
+
+    def random(self, process_name, entity=(), decision=0):
+        return next(self.streams[process_name])
+
+    def uniform(self, process_name, low, high, entity=(), decision=0):
+        return low + (high - low) * next(self.streams[process_name])
+
+    def randint(self, process_name, low, high, entity=(), decision=0):
+        return low + min(int(next(self.streams[process_name]) * (high - low + 1)), high - low)
+
+
+def splitmix64(x):
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class CommonRandomNumbers:
+
+    def __init__(self, seed=SEED, antithetic=False):
+        self.seed_state = splitmix64(seed & MASK64)
+        self.antithetic = antithetic
+
+    def random(self, process_name, entity=(), decision=0):
+        """Uniform [0, 1) value of one decision of one entity."""
+        state = splitmix64(self.seed_state ^ STREAM_CODES[process_name])
+        for key in entity:
+            state = splitmix64(state ^ (key & MASK64))
+        state = splitmix64(state ^ decision)
+        u = (state >> 11) * (1.0 / (1 << 53))
+        return 1.0 - u if self.antithetic else u
+
+    def uniform(self, process_name, low, high, entity=(), decision=0):
+        return low + (high - low) * self.random(process_name, entity, decision)
+
+    def randint(self, process_name, low, high, entity=(), decision=0):
+        return low + min(int(self.random(process_name, entity, decision) * (high - low + 1)), high - low)
+
+
+def make_random_numbers(kind, seed=SEED, antithetic=False):
+    if kind == 'block':
+        return BlockStreams(seed, antithetic)
+    if kind == 'per_process':
+        return ProcessStreams(seed, antithetic)
+    if kind == 'common':
+        return CommonRandomNumbers(seed, antithetic)
+    raise ValueError(f"random_numbers must be 'block', 'per_process' or 'common', got {kind!r}")
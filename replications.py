@@ -0,0 +1,222 @@
+import argparse
+import copy
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cache import ResultCache, cache_key
+from cli import WEEK, print_table, weeks_to_minutes, worker_count
+from modelo import (SEED, effective_parameters, parse_value, process_parameters, run_simulation, set_path, simulate,
+                    simulation_time)
+from random_numbers import RANDOM_STREAMS
+
+
+# Independent replications of one scenario.
+#
+# Every replication is a full run of the model with its own seed. The seeds
+# are spaced RANDOM_STREAMS apart, so the random streams of two replications
+# never coincide and replication 0 is the same run as run_simulation().
+# Replications are spread over a process pool (one simulation per core) and
+# summarised as mean, standard deviation and a Student-t confidence interval
+# for every KPI in results.
+
+
+def replication_seeds(replications, base_seed=SEED):
+    return [base_seed + i * RANDOM_STREAMS for i in range(replications)]
+
+
+def run_replication(simulation_time, process_parameters, seed, use_cache=True):
+    # Worker: only the KPIs travel back to the parent process
+    if not use_cache:
+        return simulate(simulation_time, process_parameters, seed).results()
+    results = ResultCache().load_results(cache_key(simulation_time, effective_parameters(process_parameters), seed))
+    if results is None:
+        results = run_simulation(simulation_time, process_parameters, seed=seed)["results"]
+    return results
+
+
+def t_cdf(t, df):
+    """Student-t cumulative distribution for an integer number of degrees of freedom."""
+    theta = math.atan(t / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if df % 2:
+        if df == 1:
+            total = 0.0
+        for k in range(3, df, 2):
+            term *= (k - 1) / k * cos2
+            total += term
+        area = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    else:
+        for k in range(2, df - 1, 2):
+            term *= (k - 1) / k * cos2
+            total += term
+        area = math.sin(theta) * total
+    return 0.5 + area / 2
+
+
+def t_quantile(p, df):
+    """Inverse of t_cdf for 0.5 < p < 1 (bisection, exact to float precision)."""
+    low, high = 0.0, 1.0
+    while t_cdf(high, df) < p:
+        high *= 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def summarize_replications(replication_results, confidence=0.95):
+    """Mean, std and confidence interval of every KPI column (one row per KPI)."""
+    import pandas as pd
+
+    rows = []
+    for kpi in replication_results.columns:
+        values = replication_results[kpi].to_numpy(dtype=np.float64)
+        n = len(values)
+        mean = values.mean()
+        std = values.std(ddof=1) if n > 1 else float('nan')
+        half_width = t_quantile((1 + confidence) / 2, n - 1) * std / math.sqrt(n) if n > 1 else float('nan')
+        rows.append({
+            'kpi': kpi,
+            'mean': mean,
+            'std': std,
+            'ci_low': mean - half_width,
+            'ci_high': mean + half_width,
+            'half_width': half_width,
+            'replications': n
+        })
+    return pd.DataFrame(rows).set_index('kpi')
+
+
+def replication_plan(process_parameters, replications, base_seed=SEED, antithetic=False):
+    """List of (seed, antithetic flag, parameters) runs of one scenario."""
+    if replications < 1:
+        raise ValueError(f"replications must be >= 1, got {replications}")
+    if not antithetic:
+        return [(seed, 'no', process_parameters) for seed in replication_seeds(replications, base_seed)]
+    if replications % 2:
+        raise ValueError(f"antithetic replications come in pairs, got an odd number: {replications}")
+    plan = []
+    for seed in replication_seeds(replications // 2, base_seed):
+        for flag in ['no', 'yes']:
+            plan.append((seed, flag, dict(process_parameters, antithetic=flag)))
+    return plan
+
+
+def execute_plan(simulation_time, plan, workers=None, use_cache=True):
+    workers = worker_count(workers, len(plan))
+    seeds = [seed for seed, _, _ in plan]
+    parameters = [params for _, _, params in plan]
+    if workers == 1:
+        return [run_replication(simulation_time, params, seed, use_cache) for params, seed in zip(parameters, seeds)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_replication, [simulation_time] * len(plan), parameters, seeds,
+                                 [use_cache] * len(plan)))
+
+
+def replication_table(plan, results):
+    import pandas as pd
+
+    table = pd.DataFrame(results)
+    table.insert(0, 'seed', [seed for seed, _, _ in plan])
+    table.insert(1, 'antithetic', [flag for _, flag, _ in plan])
+    table.index.name = 'replication'
+    return table
+
+
+def observations(table):
+    # Antithetic pairs are averaged into one observation each
+    kpis = table.drop(columns=['seed', 'antithetic'])
+    if (table['antithetic'] == 'yes').any():
+        return kpis.groupby(table['seed'].to_numpy()).mean()
+    return kpis
+
+
+def run_replications(simulation_time, process_parameters, replications=30, base_seed=SEED,
+                     workers=None, confidence=0.95, use_cache=True, antithetic=False):
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+    plan = replication_plan(process_parameters, replications, base_seed, antithetic)
+    replication_results = replication_table(plan, execute_plan(simulation_time, plan, workers, use_cache))
+    return {
+        "Replications": replication_results,
+        "Summary": summarize_replications(observations(replication_results), confidence)
+    }
+
+
+def compare_scenarios(simulation_time, parameters_a, parameters_b, replications=30, base_seed=SEED,
+                      workers=None, confidence=0.95, use_cache=True, antithetic=False):
+    """Paired comparison of two scenarios run with the same seeds.
+
+    The confidence interval of "Difference" (B - A) is built from the paired
+    differences, so it benefits from common random numbers: run both
+    scenarios with random_numbers = 'common' to get the narrowest intervals."""
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+    plan_a = replication_plan(parameters_a, replications, base_seed, antithetic)
+    plan_b = replication_plan(parameters_b, replications, base_seed, antithetic)
+    results = execute_plan(simulation_time, plan_a + plan_b, workers, use_cache)
+    table_a = replication_table(plan_a, results[:len(plan_a)])
+    table_b = replication_table(plan_b, results[len(plan_a):])
+    return {
+        "Replications A": table_a,
+        "Replications B": table_b,
+        "Summary A": summarize_replications(observations(table_a), confidence),
+        "Summary B": summarize_replications(observations(table_b), confidence),
+        "Difference": summarize_replications(observations(table_b) - observations(table_a), confidence)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run independent replications of the remanufacturing model.")
+    parser.add_argument('-n', '--replications', type=int, default=30)
+    parser.add_argument('--weeks', type=float, default=simulation_time / WEEK,
+                        help="simulation length in weeks (default: the model's simulation_time)")
+    parser.add_argument('--seed', type=int, default=SEED, help="seed of the first replication")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--common-random-numbers', action='store_true',
+                        help="key the random draws by entity and decision (random_numbers = 'common')")
+    parser.add_argument('--antithetic', action='store_true', help="run antithetic pairs of replications")
+    parser.add_argument('--compare', action='append', default=[], metavar='PATH=VALUE',
+                        help="compare against a scenario B with this parameter changed (repeatable)")
+    parser.add_argument('--output', help="write the per-replication KPIs to this CSV file")
+    parser.add_argument('--no-cache', action='store_true', help="always simulate, ignoring the result cache")
+    args = parser.parse_args(argv)
+
+    simulation_minutes = weeks_to_minutes(args.weeks)
+    parameters_a = effective_parameters(process_parameters)
+    if args.common_random_numbers:
+        parameters_a['random_numbers'] = 'common'
+
+    if not args.compare:
+        output = run_replications(simulation_minutes, parameters_a, args.replications, args.seed,
+                                  args.workers, args.confidence, not args.no_cache, args.antithetic)
+        if args.output:
+            output["Replications"].to_csv(args.output)
+        print_table(output["Summary"])
+        return
+
+    parameters_b = copy.deepcopy(parameters_a)
+    for change in args.compare:
+        path, value = change.split('=', 1)
+        set_path(parameters_b, path, parse_value(value))
+    output = compare_scenarios(simulation_minutes, parameters_a, parameters_b, args.replications, args.seed,
+                               args.workers, args.confidence, not args.no_cache, args.antithetic)
+    if args.output:
+        import pandas as pd
+
+        pd.concat({'A': output["Replications A"], 'B': output["Replications B"]}, names=['scenario']).to_csv(args.output)
+    for name in ["Summary A", "Summary B", "Difference"]:
+        print(f"{name}:")
+        print_table(output[name])
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import math
+
+import numpy as np
+
+from cli import WEEK, print_table, weeks_to_minutes
+from modelo import (ADDITIVE_KPIS, SEED, STATISTICS_COUNTERS, SimulationRun, kpis, process_parameters,
+                    simulation_output)
+from replications import t_quantile
+
+
+# Sequential run-length control: one long replication that stops when the
+# KPIs have converged.
+#
+# After the warmup (warmup_period, or the detected end with detect_warmup)
+# the run is cut into base batches of batch_time minutes. At every check the
+# base batches are grouped into `batches` equal batches (the oldest
+# remainder is left out) and every selected KPI gets a batch-means
+# confidence interval. The run stops as soon as all of them are narrower
+# than the target relative half-width, or at max_time. Totals
+# (ADDITIVE_KPIS) are estimated as rates per week and means as ratios of
+# sums (mean delay = delay time / delayed requests), so batches without a
+# delayed request still count. A KPI only counts as converged if its batch
+# means are not visibly autocorrelated, since the interval would then be
+# too narrow.
+
+DEFAULT_KPIS = ['Mean Delay Time', 'Total Cost']
+RATIO_KPIS = ['Mean Delay Time', 'Mean Lead Time']
+DELAY_COLUMN = STATISTICS_COUNTERS.index('cumulative_delay_time')
+
+
+def batch_ratio(kpi, counters, duration):
+    # (numerator, denominator) of the KPI over one batch
+    if kpi in ADDITIVE_KPIS:
+        return kpis(counters, duration)[kpi], duration / WEEK
+    if kpi == 'Mean Delay Time':
+        return counters['cumulative_delay_time'], counters['delayed_requests']
+    return duration, counters['total_requests']  # Mean Lead Time
+
+
+def ratio_interval(numerators, denominators, confidence=0.95):
+    """(estimate, half-width, lag-1 autocorrelation) of the batch-means
+    estimator sum(numerators) / sum(denominators)."""
+    k = len(numerators)
+    total = denominators.sum()
+    if total == 0:
+        return 0.0, 0.0, 0.0  # Like results(): no delayed requests, no delay
+    estimate = numerators.sum() / total
+    residuals = numerators - estimate * denominators  # Batch means of the ratio, linearised
+    half_width = t_quantile((1 + confidence) / 2, k - 1) * residuals.std(ddof=1) / (denominators.mean() * math.sqrt(k))
+    centered = residuals - residuals.mean()
+    variation = float(np.dot(centered, centered))
+    autocorrelation = float(np.dot(centered[:-1], centered[1:])) / variation if variation > 0 else 0.0
+    return estimate, half_width, autocorrelation
+
+
+def relative_half_width(estimate, half_width):
+    if estimate == 0:
+        return 0.0 if half_width == 0 else float('inf')
+    return half_width / abs(estimate)
+
+
+def batch_intervals(times, counters, selected_kpis, batches, confidence=0.95):
+    """Rows with the batch-means interval of every KPI, from the counters
+    (one row per base batch boundary, columns STATISTICS_COUNTERS) at the
+    boundary times."""
+    size = (len(times) - 1) // batches  # Base batches per batch
+    edges = np.arange(len(times) - 1 - size * batches, len(times), size)
+    durations = np.diff(times[edges])
+    increments = np.diff(counters[edges], axis=0)
+    rows = []
+    for kpi in selected_kpis:
+        ratios = [batch_ratio(kpi, dict(zip(STATISTICS_COUNTERS, row)), duration)
+                  for row, duration in zip(increments, durations)]
+        numerators, denominators = (np.array(values, dtype=np.float64) for values in zip(*ratios))
+        estimate, half_width, autocorrelation = ratio_interval(numerators, denominators, confidence)
+        rows.append({
+            'kpi': kpi if kpi in RATIO_KPIS else f'{kpi} per week',
+            'estimate': estimate,
+            'ci_low': estimate - half_width,
+            'ci_high': estimate + half_width,
+            'half_width': half_width,
+            'relative_half_width': relative_half_width(estimate, half_width),
+            'autocorrelation': autocorrelation,
+            'batches': batches,
+            'batch_time': float(durations[0])
+        })
+    return rows
+
+
+def run_sequential(process_parameters, selected_kpis=DEFAULT_KPIS, target=0.05, max_time=26 * WEEK, confidence=0.95,
+                   batches=20, batch_time=1440, check_every=WEEK, max_autocorrelation=0.3, seed=SEED):
+    """run_simulation() output of a run that stops once the relative
+    half-width of every selected KPI is below target (or at max_time), plus
+
+        'Confidence Intervals': batch-means intervals at the stop,
+        'Convergence': the intervals at every check,
+        'Stopped At', 'Converged'.
+    """
+    unknown = [kpi for kpi in selected_kpis if kpi not in ADDITIVE_KPIS + RATIO_KPIS]
+    if unknown:
+        raise ValueError(f"Unknown KPIs {unknown} (choose from {ADDITIVE_KPIS + RATIO_KPIS})")
+    if batches < 2 or batch_time <= 0 or check_every <= 0:
+        raise ValueError("Needs batches >= 2, batch_time > 0 and check_every > 0")
+
+    run = SimulationRun(max_time, process_parameters, seed)
+    run.start()
+    run.advance(run.warmup_period)
+    times = [run.env.now]
+    counters = [list(run.counters().values())]
+    history = []
+    converged = False
+    next_check = run.env.now + check_every
+    while not converged and run.env.now < max_time:
+        run.advance(run.env.now + batch_time)
+        times.append(run.env.now)
+        counters.append(list(run.counters().values()))
+        if run.env.now < next_check and run.env.now < max_time:
+            continue
+        next_check += check_every
+        if run.detect_warmup == 'yes' and run.warmup_end is None:
+            continue
+        # Only boundaries after the (detected) warmup
+        first = next(i for i, time in enumerate(times) if time >= run.statistics_start)
+        if len(times) - 1 - first < batches:
+            continue
+        values = np.array(counters[first:], dtype=np.float64)
+        # Delays of orders placed in the warmup are left out, like in results()
+        values[:, DELAY_COLUMN] -= [run.carried_delay(time) for time in times[first:]]
+        rows = batch_intervals(np.array(times[first:]), values, selected_kpis, batches, confidence)
+        for row in rows:
+            history.append({'time': run.env.now, **row})
+        converged = all(row['relative_half_width'] <= target and abs(row['autocorrelation']) <= max_autocorrelation
+                        for row in rows)
+
+    import pandas as pd
+
+    output = simulation_output(run)
+    output['Convergence'] = pd.DataFrame(history)
+    output['Confidence Intervals'] = output['Convergence'].groupby('kpi', sort=False).last() if history else pd.DataFrame()
+    output['Stopped At'] = run.env.now
+    output['Converged'] = converged
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one replication until the selected KPIs converge.")
+    parser.add_argument('--kpi', action='append', help=f"KPI to control (repeatable, default: {', '.join(DEFAULT_KPIS)})")
+    parser.add_argument('--target', type=float, default=0.05, help="relative half-width to reach (default 0.05)")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--max-weeks', type=float, default=26, help="stop here even if not converged")
+    parser.add_argument('--batches', type=int, default=20, help="batches of the batch-means intervals")
+    parser.add_argument('--batch-days', type=float, default=1, help="length of the base batches")
+    parser.add_argument('--check-weeks', type=float, default=1, help="simulated weeks between convergence checks")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--output', help="write the intervals at every check to this CSV file")
+    args = parser.parse_args(argv)
+
+    output = run_sequential(process_parameters, args.kpi or DEFAULT_KPIS, args.target, weeks_to_minutes(args.max_weeks),
+                            args.confidence, args.batches, args.batch_days * 1440, args.check_weeks * WEEK, seed=args.seed)
+    if args.output:
+        output['Convergence'].to_csv(args.output, index=False)
+    state = 'converged' if output['Converged'] else 'did not converge'
+    print(f"{state} at week {output['Stopped At'] / WEEK:.1f}")
+    print_table(output['Confidence Intervals'], '{:.4g}')
+
+
+if __name__ == "__main__":
+    main()
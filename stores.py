@@ -0,0 +1,366 @@
+import heapq
+import operator
+from array import array
+from collections import deque
+
+import simpy
+from simpy.core import BoundClass
+from simpy.resources import base
+
+from monitoring import LevelTrace
+
+
+class StorePutMany(base.Put):
+
+    def __init__(self, store, items):
+        self.items = list(items)  # Items not yet in the store
+        super().__init__(store)
+
+    def take_chunk(self, free):
+        """Next chunk of the batch if it fits into `free` places, else None.
+        A batch up to the capacity of the store is a single chunk; a larger
+        one goes in chunks of the capacity."""
+        size = min(len(self.items), self.resource.capacity)
+        if size > free:
+            return None
+        chunk = self.items[:size]
+        del self.items[:size]
+        return chunk
+
+
+class StoreGetMany(base.Get):
+
+    def __init__(self, store, quantity):
+        self.quantity = quantity
+        super().__init__(store)
+
+
+# Buffers used by the remanufacturing model.
+#
+# WaitableStore behaves exactly like simpy.Store, but a station can also ask
+# to be woken up when the buffer holds enough work instead of re-checking
+# the level every minute. put_many()/get_many() move a whole batch in one
+# event: the batch goes in only when all of it fits and comes out only when
+# all of it is there. A batch larger than the capacity goes in in chunks of
+# the capacity, each one as soon as it fits.
+class WaitableStore(simpy.Store):
+
+    def __init__(self, env, capacity=float('inf')):
+        super().__init__(env, capacity)
+        self._waiters = []  # (predicate, event) pairs, checked after each put
+        self.trace = None
+
+    def track_levels(self):
+        """Record a (time, level) point every time the level changes."""
+        self.trace = LevelTrace(self._env.now, len(self.items))
+
+    put_many = BoundClass(StorePutMany)
+    get_many = BoundClass(StoreGetMany)
+
+    def wait_for(self, quantity):
+        """Event that fires once the store holds at least `quantity` items."""
+        return self.wait_until(lambda items: len(items) >= quantity)
+
+    @property
+    def level(self):
+        return len(self.items)
+
+    def wait_until(self, predicate):
+        """Event that fires once `predicate(self.items)` becomes true."""
+        event = self._env.event()
+        if predicate(self.items):
+            event.succeed()
+        else:
+            self._waiters.append((predicate, event))
+        return event
+
+    def _do_put(self, event):
+        if isinstance(event, StorePutMany):
+            placed = False
+            while not event.triggered:
+                chunk = event.take_chunk(self._capacity - len(self.items))
+                if chunk is None:
+                    break
+                self.items.extend(chunk)
+                placed = True
+                if not event.items:
+                    event.succeed()
+            proceed = None
+        else:
+            proceed = super()._do_put(event)
+            placed = event.triggered
+        if placed:
+            if self.trace is not None:
+                self.trace.record(self._env.now, len(self.items))
+            if self._waiters:
+                self._notify_waiters()
+            if not event.triggered:
+                self._trigger_get(None)  # Make room for the rest of the batch
+        return proceed
+
+    def _do_get(self, event):
+        if isinstance(event, StoreGetMany):
+            if len(self.items) >= event.quantity:
+                batch = self.items[:event.quantity]
+                del self.items[:event.quantity]
+                event.succeed(batch)
+            proceed = None
+        else:
+            proceed = super()._do_get(event)
+        if self.trace is not None and event.triggered:
+            self.trace.record(self._env.now, len(self.items))
+        return proceed
+
+    def _notify_waiters(self):
+        pending = []
+        for predicate, event in self._waiters:
+            if predicate(self.items):
+                event.succeed()
+            else:
+                pending.append((predicate, event))
+        self._waiters = pending
+
+
+class TypedStorePut(base.Put):
+
+    def __init__(self, store, item):
+        self.item = item
+        super().__init__(store)
+
+
+class TypedStoreGet(base.Get):
+
+    def __init__(self, store, kind='any', spec=None):
+        self.kind = kind  # 'any', 'many', 'type', 'batch' or 'kit'
+        self.spec = spec
+        super().__init__(store)
+
+
+# Store for items that carry a component type. Items are kept in one FIFO
+# queue per type, so counting or withdrawing a given type never scans the
+# whole buffer. get() and get_many() keep the plain FIFO behaviour of
+# simpy.Store across all types.
+class TypedStore(base.BaseResource):
+
+    def __init__(self, env, capacity=float('inf'), type_of=operator.attrgetter('type')):
+        if capacity <= 0:
+            raise ValueError('"capacity" must be > 0.')
+        super().__init__(env, capacity)
+        self.type_of = type_of
+        self._queues = {}  # type -> deque of (arrival sequence, item)
+        self._level = 0
+        self._sequence = 0
+        self._waiters = []  # (quantity, event) pairs, checked after each put
+        self.trace = None
+        self.type_traces = None
+
+    put = BoundClass(TypedStorePut)
+    put_many = BoundClass(StorePutMany)
+
+    def track_levels(self):
+        """Record (time, level) points on every change, in total and per type."""
+        self.trace = LevelTrace(self._env.now, self._level)
+        self.type_traces = {component_type: LevelTrace(self._env.now, len(queue))
+                            for component_type, queue in self._queues.items()}
+
+    def get(self):
+        """Oldest item of any type."""
+        return TypedStoreGet(self)
+
+    def get_many(self, quantity):
+        """List of the `quantity` oldest items of any type."""
+        return TypedStoreGet(self, 'many', quantity)
+
+    def get_type(self, component_type, quantity=1):
+        """List of `quantity` items of `component_type`, oldest first."""
+        return TypedStoreGet(self, 'type', (component_type, quantity))
+
+    def get_batch(self, batch_sizes):
+        """Full batch of the type with the oldest item among the types that
+        have at least batch_sizes[type] items."""
+        return TypedStoreGet(self, 'batch', batch_sizes)
+
+    def get_kit(self, bom):
+        """All the items of a bill of materials ({type: quantity}) at once."""
+        return TypedStoreGet(self, 'kit', bom)
+
+    def wait_for(self, quantity):
+        event = self._env.event()
+        if self._level >= quantity:
+            event.succeed()
+        else:
+            self._waiters.append((quantity, event))
+        return event
+
+    @property
+    def level(self):
+        return self._level
+
+    @property
+    def items(self):
+        # Only for inspection/compatibility: O(n), use count()/counts() instead
+        return [item for _, item in heapq.merge(*self._queues.values())]
+
+    def count(self, component_type):
+        queue = self._queues.get(component_type)
+        return len(queue) if queue else 0
+
+    def counts(self):
+        return {component_type: len(queue) for component_type, queue in self._queues.items()}
+
+    def has_kit(self, bom):
+        return all(self.count(component_type) >= quantity for component_type, quantity in bom.items())
+
+    def ready_type(self, batch_sizes):
+        selected_type = None
+        oldest = None
+        for component_type, queue in self._queues.items():
+            if queue and len(queue) >= batch_sizes[component_type]:
+                if oldest is None or queue[0][0] < oldest:
+                    selected_type = component_type
+                    oldest = queue[0][0]
+        return selected_type
+
+    def _oldest_type(self):
+        return min((component_type for component_type, queue in self._queues.items() if queue),
+                   key=lambda component_type: self._queues[component_type][0][0])
+
+    def _take(self, component_type, quantity):
+        queue = self._queues[component_type]
+        self._level -= quantity
+        items = [queue.popleft()[1] for _ in range(quantity)]
+        if self.trace is not None:
+            self._record_levels(component_type)
+        return items
+
+    def _record_levels(self, component_type):
+        now = self._env.now
+        self.trace.record(now, self._level)
+        trace = self.type_traces.get(component_type)
+        if trace is None:
+            trace = self.type_traces[component_type] = self.trace.zeros()
+        trace.record(now, len(self._queues[component_type]))
+
+    def _insert(self, items):
+        changed = {}  # Types whose level changed, in order of first appearance
+        for item in items:
+            component_type = self.type_of(item)
+            queue = self._queues.get(component_type)
+            if queue is None:
+                queue = self._queues[component_type] = deque()
+            queue.append((self._sequence, item))
+            self._sequence += 1
+            changed[component_type] = True
+        self._level += len(items)
+        if self.trace is not None:
+            for component_type in changed:
+                self._record_levels(component_type)
+        if self._waiters:
+            self._notify_waiters()
+
+    def _do_put(self, event):
+        if not isinstance(event, StorePutMany):
+            if self._level < self._capacity:
+                event.succeed()
+                self._insert((event.item,))
+            return None
+        placed = False
+        while not event.triggered:
+            chunk = event.take_chunk(self._capacity - self._level)
+            if chunk is None:
+                break
+            if not event.items:
+                event.succeed()
+            self._insert(chunk)
+            placed = True
+        if placed and not event.triggered:
+            self._trigger_get(None)  # Make room for the rest of the batch
+        return None
+
+    def _do_get(self, event):
+        if event.kind == 'any':
+            if self._level:
+                event.succeed(self._take(self._oldest_type(), 1)[0])
+        elif event.kind == 'many':
+            if self._level >= event.spec:
+                event.succeed([self._take(self._oldest_type(), 1)[0] for _ in range(event.spec)])
+        elif event.kind == 'type':
+            component_type, quantity = event.spec
+            if self.count(component_type) >= quantity:
+                event.succeed(self._take(component_type, quantity))
+        elif event.kind == 'batch':
+            component_type = self.ready_type(event.spec)
+            if component_type is not None:
+                event.succeed(self._take(component_type, event.spec[component_type]))
+        elif self.has_kit(event.spec):
+            kit = []
+            for component_type, quantity in event.spec.items():
+                if quantity:  # A type the BOM does not use may never have been stored
+                    kit.extend(self._take(component_type, quantity))
+            event.succeed(kit)
+        return None
+
+    def _notify_waiters(self):
+        pending = []
+        for quantity, event in self._waiters:
+            if self._level >= quantity:
+                event.succeed()
+            else:
+                pending.append((quantity, event))
+        self._waiters = pending
+
+
+# Terminal buffer for discarded cores, components and products. Nothing is
+# ever taken out of it, so it only counts arrivals (per type when type_of is
+# given) and optionally keeps their arrival times in compact arrays. It has
+# no capacity: a put never blocks and costs O(1) time and memory.
+class CountingSink:
+
+    def __init__(self, env, type_of=None, keep_times=False):
+        self._env = env
+        self.type_of = type_of
+        self._level = 0
+        self._counts = {}  # type -> count, only when type_of is given
+        self.arrival_times = {} if keep_times else None  # type (or 'All') -> array of arrival times
+        self.trace = None
+        self.type_traces = None
+
+    def track_levels(self):
+        self.trace = LevelTrace(self._env.now, self._level)
+        self.type_traces = {item_type: LevelTrace(self._env.now, count) for item_type, count in self._counts.items()}
+
+    def put(self, item):
+        # Synchronous: the item is counted immediately, there is no event to wait for
+        now = self._env.now
+        self._level += 1
+        item_type = 'All'
+        if self.type_of is not None:
+            item_type = self.type_of(item)
+            self._counts[item_type] = self._counts.get(item_type, 0) + 1
+        if self.arrival_times is not None:
+            times = self.arrival_times.get(item_type)
+            if times is None:
+                times = self.arrival_times[item_type] = array('d')
+            times.append(now)
+        if self.trace is not None:
+            self.trace.record(now, self._level)
+            if self.type_of is not None:
+                trace = self.type_traces.get(item_type)
+                if trace is None:
+                    trace = self.type_traces[item_type] = self.trace.zeros()
+                trace.record(now, self._counts[item_type])
+
+    @property
+    def level(self):
+        return self._level
+
+    @property
+    def items(self):
+        # Only the count is kept; kept for code that uses len(buffer.items)
+        return range(self._level)
+
+    def count(self, item_type):
+        return self._counts.get(item_type, 0)
+
+    def counts(self):
+        return dict(self._counts)
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from cache import canonical_json, code_version
+from cli import WEEK, weeks_to_minutes, worker_count
+from modelo import SEED, effective_parameters, get_path, parse_value, process_parameters, set_path, simulation_time
+from replications import replication_seeds, run_replication
+
+
+# Parameter sweeps (design of experiments) over process_parameters.
+#
+# A design is a list of points, each one a {dotted path: value} dict such as
+# {'component_repair.capacity': 2, 'replenishment.thresholds.Component_A': 3}.
+# Every point is applied to a copy of the base parameters and run for a
+# number of replications on a process pool. One row per finished run is
+# appended to a CSV file as soon as it completes, so an interrupted sweep
+# can be resumed: runs already in the file are not run again. Runs are
+# identified by a hash of their full effective configuration and of the
+# model sources, so points that resolve to the same parameter set are only
+# simulated once and rows of an older engine are not reused.
+
+
+def apply_point(base_parameters, point):
+    """Effective parameters of one design point (the base is not modified)."""
+    params = effective_parameters(base_parameters)
+    for path, value in point.items():
+        set_path(params, path, value)
+    return params
+
+
+def run_key(simulation_time, params, seed):
+    return hashlib.sha256(canonical_json([simulation_time, params, seed, code_version()]).encode()).hexdigest()[:16]
+
+
+def grid_design(factors):
+    """Full factorial design from {path: [levels]}."""
+    paths = list(factors)
+    return [dict(zip(paths, levels)) for levels in itertools.product(*(factors[path] for path in paths))]
+
+
+def latin_hypercube_design(factors, samples, seed=SEED):
+    """Latin hypercube design from {path: (low, high)} or {path: [levels]}.
+
+    Ranges with integer bounds give integer values; a list of levels is
+    sampled by stratified index."""
+    rng = np.random.default_rng(seed)
+    design = [{} for _ in range(samples)]
+    for path, spec in factors.items():
+        # One point in each of `samples` equal strata, strata shuffled per factor
+        u = (rng.permutation(samples) + rng.random(samples)) / samples
+        if isinstance(spec, tuple):
+            low, high = spec
+            if isinstance(low, int) and isinstance(high, int):
+                values = [low + int(x * (high - low + 1)) for x in u.tolist()]
+            else:
+                values = [low + x * (high - low) for x in u.tolist()]
+        else:
+            values = [spec[int(x * len(spec))] for x in u.tolist()]
+        for point, value in zip(design, values):
+            point[path] = value
+    return design
+
+
+def read_completed(output):
+    """(header, run keys) of an existing sweep file, (None, empty set) otherwise."""
+    if not output or not os.path.exists(output) or os.path.getsize(output) == 0:
+        return None, set()
+    with open(output, newline='') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, {row['run'] for row in reader}
+
+
+def run_sweep(design, base_parameters=process_parameters, simulation_time=simulation_time, replications=1,
+              base_seed=SEED, workers=None, output=None, use_cache=True):
+    """Run every point of the design and return one row per run as a DataFrame.
+
+    With `output`, rows are appended to that CSV file as runs finish and runs
+    already present in it are skipped."""
+    paths = sorted({path for point in design for path in point})
+    seeds = replication_seeds(replications, base_seed)
+
+    # Expandir el diseño en ejecuciones, sin duplicados
+    runs = {}
+    for point_id, point in enumerate(design):
+        params = apply_point(base_parameters, point)
+        for replication, seed in enumerate(seeds):
+            key = run_key(simulation_time, params, seed)
+            if key not in runs:
+                runs[key] = (point_id, point, replication, seed, params)
+    header, done = read_completed(output)
+    columns = ['run', 'point', 'replication', 'seed'] + paths
+    if header is not None and header[:len(columns)] != columns:
+        # Checked before any run starts: the rows would not line up
+        raise ValueError(f"{output} was written by a sweep with other factors: {header}")
+    pending = [(key, spec) for key, spec in runs.items() if key not in done]
+
+    rows = []
+    writer = None
+    out = open(output, 'a', newline='') if output else None
+    try:
+        with ProcessPoolExecutor(max_workers=worker_count(workers, len(pending))) as executor:
+            futures = {}
+            for key, (point_id, point, replication, seed, params) in pending:
+                future = executor.submit(run_replication, simulation_time, params, seed, use_cache)
+                futures[future] = (key, point_id, point, replication, seed)
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key, point_id, point, replication, seed = futures.pop(future)
+                    row = {'run': key, 'point': point_id, 'replication': replication, 'seed': seed}
+                    row.update({path: point.get(path) for path in paths})
+                    row.update(future.result())
+                    rows.append(row)
+                    if out is not None:
+                        if writer is None:
+                            writer = csv.DictWriter(out, fieldnames=header or list(row))
+                            if header is None:
+                                writer.writeheader()
+                        writer.writerow(row)
+                        out.flush()
+    finally:
+        if out is not None:
+            out.close()
+
+    import pandas as pd
+
+    if output and os.path.exists(output):
+        return pd.read_csv(output)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep process_parameters over a grid or Latin hypercube design.")
+    parser.add_argument('--grid', action='append', default=[], metavar='PATH=V1,V2,...',
+                        help="factor levels for a full factorial design (repeatable)")
+    parser.add_argument('--lhs', action='append', default=[], metavar='PATH=LOW:HIGH',
+                        help="factor range for a Latin hypercube design (repeatable)")
+    parser.add_argument('--samples', type=int, default=10, help="Latin hypercube sample size")
+    parser.add_argument('--replications', type=int, default=1)
+    parser.add_argument('--weeks', type=float, default=simulation_time / WEEK)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--output', required=True, help="CSV file; an existing file is resumed")
+    parser.add_argument('--no-cache', action='store_true', help="always simulate, ignoring the result cache")
+    args = parser.parse_args(argv)
+    if bool(args.grid) == bool(args.lhs):
+        parser.error("give either --grid or --lhs factors")
+
+    factors = {}
+    defaults = effective_parameters(process_parameters)
+    for factor in args.grid or args.lhs:
+        path, separator, values = factor.partition('=')
+        if not separator:
+            parser.error(f"expected PATH=VALUES, got {factor!r}")
+        try:
+            get_path(defaults, path)
+        except KeyError as error:
+            parser.error(error.args[0])
+        if args.grid:
+            factors[path] = [parse_value(level) for level in values.split(',')]
+        else:
+            factors[path] = tuple(parse_value(bound) for bound in values.split(':'))
+    design = grid_design(factors) if args.grid else latin_hypercube_design(factors, args.samples, args.seed)
+
+    table = run_sweep(design, process_parameters, weeks_to_minutes(args.weeks), args.replications,
+                      args.seed, args.workers, args.output, not args.no_cache)
+    print(f"{len(table)} runs in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
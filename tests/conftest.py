@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the top of the repository; results must not come from
+# (or go to) the user's result cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['REMANUFACTURING_CACHE_DIR'] = tempfile.mkdtemp(prefix='remanufacturing_cache_')
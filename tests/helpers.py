@@ -0,0 +1,36 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from modelo import SimulationRun, process_parameters
+
+WEEK = 7 * 24 * 60
+
+
+def parameters(**flags):
+    params = copy.deepcopy(process_parameters)
+    params.update(flags)
+    return params
+
+
+def finished_run(simulation_time, params, chunk=None):
+    run = SimulationRun(simulation_time, params)
+    run.start()
+    while run.env.now < simulation_time:
+        run.advance(simulation_time if chunk is None else run.env.now + chunk)
+    return run
+
+
+def assert_same_output(a, b):
+    assert a["results"] == b["results"]
+    assert a["include_stacked_chart"] == b["include_stacked_chart"]
+    assert a["monitoring_data"].keys() == b["monitoring_data"].keys()
+    for name, series in a["monitoring_data"].items():
+        if isinstance(series, tuple):
+            for x, y in zip(series, b["monitoring_data"][name]):
+                np.testing.assert_array_equal(x, y)
+        else:
+            np.testing.assert_array_equal(series, b["monitoring_data"][name])
+    for table in ["Buffer Summary By Type", "Buffer Summary Total"]:
+        pd.testing.assert_frame_equal(a[table], b[table])
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from batch import load_scenarios, make_scenario
+from helpers import WEEK
+
+
+@pytest.mark.parametrize('name', ['../x', '/', 'a/b', '.hidden', '', 'two repairers', None])
+def test_scenario_names_must_be_plain_directory_names(name):
+    with pytest.raises(ValueError):
+        make_scenario(name, {})
+
+
+def test_weeks_and_simulation_time_are_exclusive():
+    assert make_scenario('two_weeks', {'weeks': 2})['simulation_time'] == 2 * WEEK
+    with pytest.raises(ValueError):
+        make_scenario('both', {'weeks': 2, 'simulation_time': 100})
+
+
+def test_a_scenario_duration_replaces_the_common_one(tmp_path):
+    path = tmp_path / 'plant.json'
+    path.write_text(json.dumps({'weeks': 2, 'scenarios': [{'name': 'short', 'simulation_time': 100}, {}]}))
+    scenarios = load_scenarios([str(path)])
+    assert [(scenario['name'], scenario['simulation_time']) for scenario in scenarios] == [('short', 100),
+                                                                                          ('plant_1', 2 * WEEK)]
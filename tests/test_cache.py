@@ -0,0 +1,17 @@
+import pytest
+
+from cache import ResultCache, cache_key
+from helpers import WEEK, assert_same_output
+from modelo import SEED, effective_parameters, process_parameters, run_simulation
+
+
+@pytest.mark.parametrize('track_buffer_changes', ['no', 'yes'])
+def test_cache_round_trip(tmp_path, track_buffer_changes):
+    params = dict(process_parameters, track_buffer_changes=track_buffer_changes)
+    output = run_simulation(WEEK, params, use_cache=False)
+    cache = ResultCache(str(tmp_path))
+    key = cache_key(WEEK, effective_parameters(params), SEED)
+    assert cache.load(key) is None
+    cache.store(key, output)
+    assert_same_output(cache.load(key), output)
+    assert cache.load_results(key) == output['results']
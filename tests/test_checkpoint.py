@@ -0,0 +1,26 @@
+import pytest
+
+from checkpoint import resume_run, run_with_checkpoints
+from helpers import WEEK, assert_same_output, finished_run, parameters
+from modelo import process_parameters, simulation_output
+
+
+@pytest.mark.parametrize('event_driven_stations', ['no', 'yes'])
+def test_checkpoint_resume_and_extend(tmp_path, event_driven_stations):
+    params = parameters(event_driven_stations=event_driven_stations)
+    expected = simulation_output(finished_run(2 * WEEK, params))
+
+    path = str(tmp_path / 'run.ckpt')
+    run_with_checkpoints(WEEK, params, path, every=WEEK / 2)
+    assert resume_run(path).env.now == WEEK
+    # A finished checkpoint is extended to the longer horizon
+    assert_same_output(run_with_checkpoints(2 * WEEK, params, path, every=WEEK / 2), expected)
+    # Resuming the finished run gives the same output again
+    assert_same_output(simulation_output(resume_run(path)), expected)
+
+
+def test_checkpoint_of_other_parameters_is_refused(tmp_path):
+    path = str(tmp_path / 'run.ckpt')
+    run_with_checkpoints(WEEK / 2, process_parameters, path, every=WEEK / 2)
+    with pytest.raises(ValueError):
+        run_with_checkpoints(WEEK, parameters(event_driven_stations='yes'), path, every=WEEK / 2)
@@ -0,0 +1,16 @@
+import pytest
+
+from modelo import process_parameters, simulate
+
+WEEK = 7 * 24 * 60
+
+
+@pytest.mark.parametrize('random_numbers', ['per_process', 'block', 'common'])
+def test_event_driven_stations_match_polling(random_numbers):
+    params = dict(process_parameters, random_numbers=random_numbers)
+    polling = simulate(2 * WEEK, dict(params, event_driven_stations='no')).results()
+    event_driven = simulate(2 * WEEK, dict(params, event_driven_stations='yes')).results()
+    delay = polling.pop('Mean Delay Time') - event_driven.pop('Mean Delay Time')
+    assert polling == event_driven
+    # Polling stations only notice new work at the next minute, at each of the seven stations
+    assert 0 <= delay <= 7
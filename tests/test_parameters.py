@@ -0,0 +1,11 @@
+import pytest
+
+from modelo import effective_parameters, process_parameters
+from parameters import compile_parameters
+
+
+def test_buffer_log_needs_sampled_monitoring():
+    compile_parameters(effective_parameters(dict(process_parameters, keep_buffer_log='yes')))
+    with pytest.raises(ValueError, match='keep_buffer_log'):
+        compile_parameters(effective_parameters(dict(process_parameters, keep_buffer_log='yes',
+                                                     track_buffer_changes='yes')))
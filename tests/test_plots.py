@@ -0,0 +1,23 @@
+import numpy as np
+
+from plots import decimate, envelope_indices
+
+
+def test_envelope_keeps_the_first_last_minimum_and_maximum_of_each_bucket():
+    values = np.array([5, 1, 9, 4, 3,  # Bucket 0: min at 1, max at 2
+                       7, 7, 0, 8, 6,  # Bucket 1: min at 7, max at 8
+                       2, 2, 2])       # Bucket 2, short: all equal
+    keep = envelope_indices(values, buckets=3)
+    assert list(keep) == [0, 1, 2, 4, 5, 7, 8, 9, 10, 12]
+
+
+def test_short_series_are_not_decimated():
+    assert list(envelope_indices(np.arange(12.0), buckets=3)) == list(range(12))
+
+
+def test_decimated_series_keeps_its_extremes():
+    values = np.sin(np.linspace(0, 20, 100_000))
+    times, kept = decimate(np.arange(len(values)), values)
+    assert len(kept) <= 4000
+    assert kept.min() == values.min() and kept.max() == values.max()
+    assert times[0] == 0 and times[-1] == len(values) - 1
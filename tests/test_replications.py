@@ -0,0 +1,19 @@
+import pytest
+
+from replications import t_cdf, t_quantile
+
+
+@pytest.mark.parametrize('p, df, expected', [
+    (0.975, 1, 12.706204736),
+    (0.975, 10, 2.228138852),
+    (0.95, 30, 1.697260887),
+    (0.995, 4, 4.604094871),
+])
+def test_t_quantile(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, rel=1e-8)
+    assert t_cdf(t_quantile(p, df), df) == pytest.approx(p, rel=1e-12)
+
+
+def test_t_cdf_is_symmetric():
+    assert t_cdf(0.0, 7) == pytest.approx(0.5)
+    assert t_cdf(-1.3, 7) == pytest.approx(1 - t_cdf(1.3, 7))
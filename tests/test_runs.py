@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers import WEEK, assert_same_output, finished_run, parameters
+from modelo import process_parameters, run_simulation, simulation_output, stream_simulation
+
+
+@pytest.mark.parametrize('track_buffer_changes', ['no', 'yes'])
+def test_chunked_advance_matches_one_run(track_buffer_changes):
+    params = parameters(track_buffer_changes=track_buffer_changes)
+    whole = simulation_output(finished_run(WEEK, params))
+    chunked = simulation_output(finished_run(WEEK, params, chunk=997))
+    assert_same_output(whole, chunked)
+
+
+def test_stream_simulation_matches_run_simulation():
+    expected = run_simulation(WEEK, process_parameters, use_cache=False)
+    snapshots = list(stream_simulation(WEEK, process_parameters, slice_time=1440))
+    last = snapshots[-1]
+    assert last['time'] == WEEK
+    assert last['results'] == expected['results']
+    for kpi, total in expected['results'].items():
+        if kpi in snapshots[0]['increments']:
+            assert sum(snapshot['increments'][kpi] for snapshot in snapshots) == pytest.approx(total)
+    for name, series in expected['monitoring_data'].items():
+        np.testing.assert_array_equal(np.concatenate([snapshot['monitoring_data'][name] for snapshot in snapshots]),
+                                      series)
+    for table in ["Buffer Summary By Type", "Buffer Summary Total"]:
+        pd.testing.assert_frame_equal(last[table], expected[table])
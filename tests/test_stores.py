@@ -0,0 +1,167 @@
+from collections import namedtuple
+
+import pytest
+import simpy
+
+from helpers import WEEK, parameters
+from modelo import simulate
+from stores import CountingSink, TypedStore, WaitableStore
+
+Item = namedtuple('Item', 'type serial')
+
+
+def items(types):
+    return [Item(item_type, serial) for serial, item_type in enumerate(types)]
+
+
+def run_process(env, generator):
+    process = env.process(generator)
+    env.run()
+    return process.value
+
+
+def test_waitable_store_moves_whole_batches():
+    env = simpy.Environment()
+    store = WaitableStore(env, capacity=5)
+    store.track_levels()
+    log = []
+
+    def consumer():
+        batch = yield store.get_many(3)
+        log.append((env.now, batch))
+
+    def producer():
+        yield store.put_many([1, 2])
+        yield env.timeout(1)
+        yield store.put_many([3, 4])
+
+    env.process(consumer())
+    env.process(producer())
+    env.run()
+    assert log == [(1, [1, 2, 3])]
+    assert store.items == [4]
+    # Changes at the same instant collapse into one step
+    assert list(store.trace.times) == [0, 1]
+    assert list(store.trace.levels) == [2, 1]
+
+
+def test_waitable_store_batch_waits_until_it_fits():
+    env = simpy.Environment()
+    store = WaitableStore(env, capacity=3)
+    store.items.extend([0, 0])
+    put = store.put_many([1, 2])
+    env.run()
+    assert not put.triggered
+    store.get()
+    env.run()
+    assert put.processed
+    assert store.items == [0, 1, 2]
+
+
+@pytest.mark.parametrize('store_class', [WaitableStore, TypedStore])
+def test_batch_larger_than_the_capacity_goes_in_chunks(store_class):
+    env = simpy.Environment()
+    store = store_class(env, capacity=3)
+    taken = []
+
+    def producer():
+        yield store.put_many(items('ab' * 4))
+        taken.append(('done', env.now))
+
+    def consumer():
+        while True:
+            yield env.timeout(1)
+            item = yield store.get()
+            taken.append(item.serial)
+
+    env.process(producer())
+    env.process(consumer())
+    env.run(until=20)
+    assert taken == [0, 1, 2, 3, 4, ('done', 5), 5, 6, 7]
+    assert store.level == 0
+
+
+def test_typed_store_counts_and_withdraws_by_type():
+    env = simpy.Environment()
+    store = TypedStore(env)
+    store.track_levels()
+
+    def process():
+        yield store.put_many(items('abcab'))
+        first = yield store.get()
+        some = yield store.get_many(2)
+        a = yield store.get_type('a')
+        return first, some, a
+
+    first, some, a = run_process(env, process())
+    assert first.serial == 0
+    assert [item.serial for item in some] == [1, 2]
+    assert [item.serial for item in a] == [3]
+    assert store.level == 1 and store.counts() == {'a': 0, 'b': 1, 'c': 0}
+    assert store.type_traces['b'].levels[-1] == 1
+
+
+def test_typed_store_kits_and_batches_wait_for_all_items():
+    env = simpy.Environment()
+    store = TypedStore(env)
+    log = []
+
+    def assembler():
+        kit = yield store.get_kit({'a': 1, 'b': 2})
+        log.append((env.now, sorted(item.serial for item in kit)))
+        batch = yield store.get_batch({'a': 2, 'b': 3, 'c': 1})
+        log.append((env.now, [item.serial for item in batch]))
+
+    def supplier():
+        yield store.put_many(items('ab'))
+        yield env.timeout(1)
+        yield store.put(Item('b', 2))
+        yield env.timeout(1)
+        yield store.put_many([Item('a', 3), Item('c', 4)])
+
+    env.process(assembler())
+    env.process(supplier())
+    env.run()
+    assert log == [(1, [0, 1, 2]), (2, [4])]
+    assert store.level == 1
+
+
+def test_counting_sink_counts_by_type():
+    env = simpy.Environment()
+    sink = CountingSink(env, type_of=lambda item: item.type, keep_times=True)
+    sink.track_levels()
+
+    def discard():
+        for item in items('aab'):
+            sink.put(item)
+            yield env.timeout(2)
+
+    env.process(discard())
+    env.run()
+    assert sink.level == 3
+    assert sink.counts() == {'a': 2, 'b': 1}
+    assert sink.count('c') == 0
+    assert list(sink.arrival_times['a']) == [0, 2]
+    assert len(sink.items) == 3
+    assert list(sink.type_traces['b'].levels) == [0, 1]
+
+
+def test_kit_skips_types_with_quantity_zero():
+    env = simpy.Environment()
+    store = TypedStore(env)
+
+    def assembler():
+        # 'c' was never stored
+        kit = yield store.get_kit({'a': 1, 'b': 1, 'c': 0})
+        return sorted(item.serial for item in kit)
+
+    store.put_many(items('ab'))
+    assert run_process(env, assembler()) == [0, 1]
+    assert store.level == 0
+
+
+@pytest.mark.parametrize('event_driven_stations', ['no', 'yes'])
+def test_model_runs_with_a_component_left_out_of_the_bill_of_materials(event_driven_stations):
+    params = parameters(event_driven_stations=event_driven_stations)
+    params['bill_of_materials']['Component_C'] = 0
+    assert simulate(2 * WEEK, params).results()['Total Requests'] > 0
@@ -0,0 +1,14 @@
+import pytest
+
+import sweep
+from helpers import WEEK
+
+
+def test_file_of_a_sweep_with_other_factors_is_refused_before_running(tmp_path, monkeypatch):
+    output = tmp_path / 'sweep.csv'
+    header = 'run,point,replication,seed,component_cleaning.capacity,Total Requests\n'
+    output.write_text(header)
+    monkeypatch.setattr(sweep, 'ProcessPoolExecutor', None)  # No run may start
+    with pytest.raises(ValueError, match='other factors'):
+        sweep.run_sweep([{'component_repair.capacity': 2}], simulation_time=WEEK, output=str(output))
+    assert output.read_text() == header
@@ -0,0 +1,52 @@
+import numpy as np
+
+from monitoring import LevelTrace, WarmupDetector, mser_truncation
+
+
+def test_mser_keeps_a_stationary_series():
+    assert mser_truncation(np.full(50, 3.0)) == 0
+    assert mser_truncation(np.random.default_rng(1).normal(size=100)) <= 10
+
+
+def test_mser_cuts_the_transient():
+    noise = np.random.default_rng(2).normal(scale=0.5, size=200)
+    transient = np.concatenate([np.linspace(20, 0, 20, endpoint=False), np.zeros(180)])
+    assert 15 <= mser_truncation(transient + noise) <= 25
+
+
+def test_mser_rejects_a_trend():
+    assert mser_truncation(np.arange(100.0)) is None
+    assert mser_truncation([1.0, 2.0, 3.0]) is None  # Too short
+
+
+def test_mser_truncation_minimises_the_statistic():
+    z = np.random.default_rng(3).normal(size=60) + np.r_[np.full(10, 4.0), np.zeros(50)]
+    statistics = [np.var(z[d:]) / (len(z) - d) for d in range(len(z) // 2 + 1)]
+    assert mser_truncation(z) == int(np.argmin(statistics))
+
+
+def test_warmup_detector_waits_for_min_samples():
+    detector = WarmupDetector(1, batch_size=5, check_batches=4, min_samples=100)
+    checks = [detector.add([1.0]) for _ in range(100)]
+    assert sum(checks) == 5
+    assert detector.count == 20
+    assert detector.truncation() == 0
+    detector.require(200)
+    assert detector.truncation() is None
+
+
+def test_level_trace_rebase_matches_a_trace_started_at_the_cut():
+    steps = [(1, 4), (3, 2), (4, 7), (6, 1), (8, 5), (9, 3)]
+    marked = LevelTrace(0, 0)
+    reference = None
+    for time, level in steps:
+        marked.record(time, level)
+        if time in (2, 4, 6):
+            marked.mark(time)
+        if time == 4:
+            reference = LevelTrace(4, level)
+        elif reference is not None:
+            reference.record(time, level)
+    marked.mark(7)
+    marked.rebase(4)
+    assert marked.summary(10) == reference.summary(10)
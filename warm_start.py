@@ -0,0 +1,140 @@
+import argparse
+import copy
+import multiprocessing
+import time
+
+from cli import WEEK, print_table, weeks_to_minutes, worker_count
+from modelo import (SEED, SimulationRun, parse_value, process_parameters, set_path, simulation_output, simulation_time,
+                    warmup_min_samples)
+from parameters import compile_parameters
+from sweep import grid_design
+
+
+# Warm-state snapshots: simulate the warmup once, branch many scenarios from it.
+#
+# The snapshot is the warmed-up SimulationRun kept in this process (a
+# running model cannot be pickled, see modelo.SimulationRun), and every
+# branch runs in a child process forked from it: the child inherits the
+# whole state (buffers, jobs in progress, pending events, backorders, random
+# number streams) copy-on-write, applies its parameter changes and runs to
+# the end. Workers run a single branch each, so every branch starts from the
+# same state. Needs the 'fork' start method (Linux, macOS).
+#
+# Only the parameters below can differ between branches: the station
+# processes read them at every decision. Capacities, batch sizes and buffer
+# sizes are fixed once the plant is built.
+BRANCH_PARAMETERS = [
+    'demand',
+    'cores_arrival',
+    'replenishment',
+    'cleaning_and_inspection.quality_thresholds',
+    'cleaning_and_inspection.process_times',
+    'disassembly.process_time',
+    'component_repair.quality_thresholds',
+    'component_repair.easiness_to_repair_thresholds',
+    'component_repair.process_times',
+    'component_repair.max_repair_attempts',
+    'include_demand_variability',
+    'include_arrival_variability',
+    'replenish_buffers',
+    'discard_at_cleaning_and_inspection',
+]
+
+# Flags the processes read from SimulationRun attributes
+BRANCH_FLAGS = ['include_demand_variability', 'include_arrival_variability', 'replenish_buffers',
+                'discard_at_cleaning_and_inspection']
+
+_warm_run = None  # Snapshot inherited by the forked workers
+
+
+def check_branch(changes):
+    for path in changes:
+        if not any(path == prefix or path.startswith(prefix + '.') for prefix in BRANCH_PARAMETERS):
+            raise ValueError(f"{path} cannot change after warmup (branch parameters: {', '.join(BRANCH_PARAMETERS)})")
+
+
+def apply_branch(run, changes):
+    for path, value in changes.items():
+        set_path(run.params, path, value)
+    # In place: the running processes hold a reference to run.tables
+    run.tables.__dict__.update(compile_parameters(run.params).__dict__)
+    for flag in BRANCH_FLAGS:
+        setattr(run, flag, run.params[flag])
+    if run.warmup_detector is not None:
+        # How long MSER must look depends on the demand and arrival intervals
+        run.warmup_detector.require(warmup_min_samples(run))
+
+
+def run_branch(changes, full_output=False):
+    # Runs in a freshly forked worker, on its own copy of the warm run
+    run = _warm_run
+    apply_branch(run, changes)
+    run.advance(run.simulation_time)
+    return simulation_output(run) if full_output else run.results()
+
+
+class WarmState:
+
+    def __init__(self, simulation_time, process_parameters, seed=SEED, warmup_time=None):
+        """Simulate up to warmup_time (the run's warmup_period by default)."""
+        self.run = SimulationRun(simulation_time, process_parameters, seed)
+        self.time = self.run.warmup_period if warmup_time is None else warmup_time
+        self.run.start()
+        self.run.advance(self.time)
+
+    def run_branches(self, branches, workers=None, full_output=False):
+        """KPIs (or full run_simulation outputs) of every branch, a
+        {path: value} dict of changes applied to the warm state."""
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Branching a warm state needs the 'fork' start method (Linux, macOS)")
+        for changes in branches:
+            # Errores antes de lanzar ningún proceso
+            check_branch(changes)
+            params = copy.deepcopy(self.run.params)
+            for path, value in changes.items():
+                set_path(params, path, value)
+            compile_parameters(params)
+        global _warm_run
+        _warm_run = self.run
+        try:
+            workers = worker_count(workers, len(branches))
+            # maxtasksperchild=1: every branch gets a new worker forked from the warm state
+            with multiprocessing.get_context('fork').Pool(workers, maxtasksperchild=1) as pool:
+                return pool.starmap(run_branch, [(changes, full_output) for changes in branches], chunksize=1)
+        finally:
+            _warm_run = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a grid of policy branches from one warmed-up plant.")
+    parser.add_argument('--grid', action='append', default=[], required=True, metavar='PATH=V1,V2,...',
+                        help="branch parameter levels, full factorial (repeatable)")
+    parser.add_argument('--weeks', type=float, default=simulation_time / WEEK)
+    parser.add_argument('--warmup', type=float, default=None, help="warmup in minutes (default: warmup_period)")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--output', help="write one row per branch to this CSV file")
+    args = parser.parse_args(argv)
+
+    factors = {}
+    for factor in args.grid:
+        path, levels = factor.split('=', 1)
+        factors[path] = [parse_value(level) for level in levels.split(',')]
+    design = grid_design(factors)
+
+    import pandas as pd
+
+    started = time.perf_counter()
+    warm = WarmState(weeks_to_minutes(args.weeks), process_parameters, args.seed, args.warmup)
+    warmed = time.perf_counter()
+    table = pd.DataFrame(warm.run_branches(design, args.workers))
+    table = pd.concat([pd.DataFrame(design), table], axis=1)
+    table.index.name = 'branch'
+    if args.output:
+        table.to_csv(args.output)
+    print_table(table)
+    print(f"warmup to t={warm.time:g}: {warmed - started:.2f} s, {len(design)} branches: {time.perf_counter() - warmed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()